@@ -1,11 +1,18 @@
 """The schedule integration."""
 
+import asyncio
+import json
 import logging
+import os
+from datetime import timedelta
 
+import homeassistant.helpers.config_validation as cv
+import homeassistant.util.dt as dt_util
 import voluptuous as vol
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import WEEKDAYS
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP, WEEKDAYS
 from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers.dispatcher import (
     async_dispatcher_connect,
     async_dispatcher_send,
@@ -13,110 +20,344 @@ from homeassistant.helpers.dispatcher import (
 from homeassistant.helpers.entity_registry import (
     async_get_registry as get_entity_registry,
 )
+from homeassistant.helpers.sun import get_astral_location
 
 from . import const
-from .store import async_get_registry
-from .util import validate_condition_str, validate_time_str, validate_weekdays
+from .engine import ScheduleEngine
+from .history import TransitionHistory
+from .simulate import ScheduleSimulator, astral_sun_event_func, timeline_as_dict
+from .store import (
+    async_get_registry,
+    async_remove_registry,
+    get_history_storage_key,
+)
+from .util import (
+    ensure_list,
+    validate_condition_str,
+    validate_date_ranges,
+    validate_dates,
+    validate_months,
+    validate_time_str,
+    validate_weekdays,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
 STORAGE_VERSION = 1
 STORAGE_KEY = f"{const.DOMAIN}_storage"
 SAVE_DELAY = 10
+PLATFORMS = ["binary_sensor", "sensor"]
+
+UPDATE_SCHEDULE_SCHEMA = {
+    vol.Required(const.ATTR_SCHEDULE_ID): str,
+    vol.Optional(const.ATTR_TIME_BEFORE): validate_time_str,
+    vol.Optional(const.ATTR_TIME_AFTER): validate_time_str,
+    vol.Optional(const.ATTR_WEEKDAYS): validate_weekdays,
+    vol.Optional(const.ATTR_CONDITION): validate_condition_str,
+    vol.Optional(const.ATTR_MONTHS): validate_months,
+    vol.Optional(const.ATTR_DATES): validate_dates,
+    vol.Optional(const.ATTR_DATE_RANGES): validate_date_ranges,
+    vol.Optional(const.ATTR_EXCLUDE_DATES): validate_dates,
+    vol.Optional(const.ATTR_EXPOSE): cv.boolean,
+}
 
 
 async def async_setup(hass: HomeAssistant, config: dict):
     """Initialize basic config."""
-    hass.data[const.DATA_DOMAIN] = {
-        const.DATA_WORKDAY_SENSOR: None,
-        const.DATA_SCHEDULES: {},
-    }
+    # every config entry has its own partition of schedules
+    hass.data[const.DATA_DOMAIN] = {}
+    await register_services(hass)
     return True
 
 
 async def async_options_updated(hass: HomeAssistant, entry: ConfigEntry):
     """Handle options update."""
-    workday_sensor = entry.options.get(
-        "workday_sensor", entry.data.get("workday_sensor")
+    engine = hass.data[const.DATA_DOMAIN][entry.entry_id][const.DATA_ENGINE]
+    if entry.options.get(const.CONF_PERSIST_HISTORY, False) != (
+        engine.history.persisted
+    ):
+        # the history needs to be (re)loaded
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
+    await engine.async_set_workday_sensor(
+        entry.options.get("workday_sensor", entry.data.get("workday_sensor"))
     )
-    hass.data[const.DATA_DOMAIN][const.DATA_WORKDAY_SENSOR] = workday_sensor
-    for sched in hass.data[const.DATA_DOMAIN][const.DATA_SCHEDULES].values():
-        await sched.async_update_sensor()
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Set up from a config entry."""
 
-    await async_options_updated(hass, entry)
-    entry.add_update_listener(async_options_updated)
+    # get the stored schedules from disk
+    store = await async_get_registry(hass, entry)
+    history = TransitionHistory(
+        hass,
+        get_history_storage_key(entry)
+        if entry.options.get(const.CONF_PERSIST_HISTORY)
+        else None,
+    )
+    await history.async_load()
+    engine = ScheduleEngine(
+        hass,
+        entry.entry_id,
+        store,
+        entry.options.get("workday_sensor", entry.data.get("workday_sensor")),
+        history,
+    )
+    partition = hass.data[const.DATA_DOMAIN][entry.entry_id] = {
+        const.DATA_ENGINE: engine,
+        const.DATA_STORE: store,
+        const.DATA_LISTENERS: [],
+    }
+    await engine.async_start()
+    listeners = partition[const.DATA_LISTENERS]
+    listeners.append(entry.add_update_listener(async_options_updated))
 
-    # Load platforms
-    for component in ["binary_sensor", "sensor"]:
-        hass.async_create_task(
-            hass.config_entries.async_forward_entry_setup(entry, component)
-        )
+    async def async_stop_engine(event):
+        """Stop the engine (and save its history) when Home Assistant stops."""
+        engine.async_stop()
+        await history.async_save()
 
-    # get the stored schedules from disk
-    store = await async_get_registry(hass)
+    listeners.append(
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, async_stop_engine)
+    )
 
     @callback
     def binary_sensor_platform_loaded():
         """Handle callback when Binary Sensor platform is loaded."""
         for item in store.schedules.values():
-            async_dispatcher_send(hass, "new_schedule_registered", item.schedule_id)
+            if item.expose:
+                async_dispatcher_send(
+                    hass, f"new_schedule_registered_{entry.entry_id}", item.schedule_id
+                )
 
-    async_dispatcher_connect(
-        hass, "schedule_binary_sensor_platform_loaded", binary_sensor_platform_loaded
+    listeners.append(
+        async_dispatcher_connect(
+            hass,
+            f"schedule_binary_sensor_platform_loaded_{entry.entry_id}",
+            binary_sensor_platform_loaded,
+        )
     )
 
-    # Register Services
-    await register_services(hass)
+    # Load platforms
+    for component in PLATFORMS:
+        hass.async_create_task(
+            hass.config_entries.async_forward_entry_setup(entry, component)
+        )
 
     return True
 
 
+async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
+    """Unload a config entry."""
+    unload_ok = all(
+        await asyncio.gather(
+            *[
+                hass.config_entries.async_forward_entry_unload(entry, component)
+                for component in PLATFORMS
+            ]
+        )
+    )
+    if unload_ok:
+        partition = hass.data[const.DATA_DOMAIN].pop(entry.entry_id)
+        for remove_listener in partition[const.DATA_LISTENERS]:
+            remove_listener()
+        partition[const.DATA_ENGINE].async_stop()
+        await partition[const.DATA_ENGINE].history.async_save()
+        await partition[const.DATA_STORE].async_save()
+    return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry):
+    """Remove the stored schedules and history of a deleted config entry."""
+    await async_remove_registry(hass, entry)
+    await TransitionHistory(hass, get_history_storage_key(entry)).async_remove_storage()
+
+
+@callback
+def async_get_partition(hass: HomeAssistant, service) -> str:
+    """Return the config entry_id of the partition a service call targets.
+
+    The partition can be given by entry_id, unique_id or title of the
+    config entry, if omitted the partition containing the schedule is used
+    or the only partition if there's just one.
+    """
+    partitions = hass.data[const.DATA_DOMAIN]
+    partition = service.data.get(const.ATTR_PARTITION)
+    if partition:
+        for entry in hass.config_entries.async_entries(const.DOMAIN):
+            if entry.entry_id not in partitions:
+                continue
+            if partition in (entry.entry_id, entry.unique_id, entry.title):
+                return entry.entry_id
+        raise HomeAssistantError(f"Unknown partition: {partition}")
+    schedule_id = service.data.get(const.ATTR_SCHEDULE_ID)
+    if isinstance(schedule_id, str):
+        for entry_id, item in partitions.items():
+            if item[const.DATA_STORE].async_get(schedule_id):
+                return entry_id
+    if len(partitions) == 1:
+        return next(iter(partitions))
+    raise HomeAssistantError("Please specify the partition")
+
+
+async def async_update_exposure(hass: HomeAssistant, entry_id: str, record):
+    """Add or remove the binary sensor of a schedule as per its expose flag."""
+    if not record.entry.expose:
+        await async_remove_entity(hass, record)
+    elif record.entity is None:
+        async_dispatcher_send(
+            hass, f"new_schedule_registered_{entry_id}", record.schedule_id
+        )
+
+
+async def async_remove_entity(hass: HomeAssistant, record):
+    """Remove the binary sensor of a schedule (if any) from hass."""
+    entity = record.entity
+    if entity is None:
+        return
+    record.entity = None
+    entity_id = entity.entity_id
+    await entity.async_remove()
+    # remove entity from entity registry
+    entity_registry = await get_entity_registry(hass)
+    entity_registry.async_remove(entity_id)
+
+
 async def register_services(hass: HomeAssistant):
     """Register all our services."""
+    partitions = hass.data[const.DATA_DOMAIN]
 
     async def add_schedule(service):
         """Add a new schedule."""
-        store = await async_get_registry(hass)
+        entry_id = async_get_partition(hass, service)
+        store = partitions[entry_id][const.DATA_STORE]
         new_sched = store.async_create(
             schedule_id=service.data[const.ATTR_SCHEDULE_ID],
             after=service.data[const.ATTR_TIME_AFTER],
             before=service.data[const.ATTR_TIME_BEFORE],
             weekdays=service.data[const.ATTR_WEEKDAYS],
             condition=service.data[const.ATTR_CONDITION],
+            months=service.data.get(const.ATTR_MONTHS),
+            dates=service.data.get(const.ATTR_DATES),
+            date_ranges=service.data.get(const.ATTR_DATE_RANGES),
+            exclude_dates=service.data.get(const.ATTR_EXCLUDE_DATES),
+            expose=service.data[const.ATTR_EXPOSE],
         )
-        async_dispatcher_send(hass, "new_schedule_registered", new_sched.schedule_id)
+        engine = partitions[entry_id][const.DATA_ENGINE]
+        record = await engine.async_add(new_sched.schedule_id)
+        await async_update_exposure(hass, entry_id, record)
 
     async def delete_schedule(service):
         """Delete an existing schedule."""
-        store = await async_get_registry(hass)
+        entry_id = async_get_partition(hass, service)
+        partition = partitions[entry_id]
         schedule_id = service.data[const.ATTR_SCHEDULE_ID]
-        if store.async_delete(schedule_id):
-            # remove entity from hass
-            entity_id = hass.data[const.DATA_DOMAIN][const.DATA_SCHEDULES][
-                schedule_id
-            ].entity_id
-            await hass.data[const.DATA_DOMAIN][const.DATA_SCHEDULES][
-                schedule_id
-            ].async_remove()
-            hass.data[const.DATA_DOMAIN][const.DATA_SCHEDULES].pop(schedule_id, None)
-            # remove entity from entity registry
-            entity_registry = await get_entity_registry(hass)
-            entity_registry.async_remove(entity_id)
-            async_dispatcher_send(hass, "schedule_updated", schedule_id)
+        if partition[const.DATA_STORE].async_delete(schedule_id):
+            record = partition[const.DATA_ENGINE].async_remove(schedule_id)
+            if record is not None:
+                await async_remove_entity(hass, record)
+            async_dispatcher_send(hass, f"schedule_updated_{entry_id}", schedule_id)
             _LOGGER.warning("Schedule deleted: %s", schedule_id)
 
+    async def async_apply_updates(entry_id: str, updates: dict):
+        """Apply changes (by schedule_id) to the store and engine in one pass."""
+        partition = partitions[entry_id]
+        engine = partition[const.DATA_ENGINE]
+        store = partition[const.DATA_STORE]
+        unknown = [
+            schedule_id for schedule_id in updates if not store.async_get(schedule_id)
+        ]
+        if unknown:
+            raise HomeAssistantError(f"Unknown schedule(s): {', '.join(unknown)}")
+        changes = store.async_update_many(updates)
+        await engine.async_apply_changes(changes)
+        for schedule_id, changed in changes.items():
+            if const.ATTR_EXPOSE in changed:
+                await async_update_exposure(hass, entry_id, engine.records[schedule_id])
+
     async def update_schedule(service):
         """Update an existing schedule."""
-        store = await async_get_registry(hass)
-        schedule_id = service.data[const.ATTR_SCHEDULE_ID]
-        store.async_update(schedule_id, service.data)
-        await hass.data[const.DATA_DOMAIN][const.DATA_SCHEDULES][
-            schedule_id
-        ].async_initialize_sensor()
+        changes = dict(service.data)
+        changes.pop(const.ATTR_PARTITION, None)
+        await async_apply_updates(
+            async_get_partition(hass, service),
+            {service.data[const.ATTR_SCHEDULE_ID]: changes},
+        )
+
+    async def update_schedules(service):
+        """Update multiple existing schedules at once."""
+        await async_apply_updates(
+            async_get_partition(hass, service),
+            {
+                item[const.ATTR_SCHEDULE_ID]: item
+                for item in service.data[const.ATTR_SCHEDULES]
+            },
+        )
+
+    async def simulate(service):
+        """Simulate the on/off timeline of schedules and write it to file."""
+        store = partitions[async_get_partition(hass, service)][const.DATA_STORE]
+        schedule_ids = service.data.get(const.ATTR_SCHEDULE_ID)
+        entries = [
+            entry
+            for entry in store.schedules.values()
+            if not schedule_ids or entry.schedule_id in schedule_ids
+        ]
+        start = service.data.get(const.ATTR_START_DATE, dt_util.now().date())
+        end = service.data.get(const.ATTR_END_DATE, start)
+        # resolve the (cached) location in the event loop, not in the executor
+        simulator = ScheduleSimulator(
+            astral_sun_event_func(get_astral_location(hass)),
+            holidays=service.data.get(const.ATTR_HOLIDAYS),
+        )
+        # only (json) files in the config dir or in allowlist_external_dirs
+        output = os.path.realpath(hass.config.path(service.data[const.ATTR_OUTPUT]))
+        in_config_dir = os.path.dirname(output) == os.path.realpath(
+            hass.config.config_dir
+        )
+        if not output.endswith(".json") or not (
+            in_config_dir or hass.config.is_allowed_path(output)
+        ):
+            raise HomeAssistantError(f"Output path is not allowed: {output}")
+
+        def run_simulation():
+            """Run the simulation (in executor)."""
+            timeline = simulator.simulate(entries, start, end)
+            with open(output, "w", encoding="utf-8") as output_file:
+                json.dump(timeline_as_dict(timeline), output_file, indent=2)
+
+        await hass.async_add_executor_job(run_simulation)
+        _LOGGER.info(
+            "Simulated %s schedule(s) from %s to %s: %s",
+            len(entries),
+            start,
+            end,
+            output,
+        )
+
+    async def get_history(service):
+        """Fire event with active duration and transitions of schedules in a period."""
+        entry_id = async_get_partition(hass, service)
+        engine = partitions[entry_id][const.DATA_ENGINE]
+        # naive datetimes are in local time
+        end = dt_util.as_utc(service.data.get(const.ATTR_END, dt_util.utcnow()))
+        start = dt_util.as_utc(
+            service.data.get(const.ATTR_START, end - timedelta(days=7))
+        )
+        schedule_ids = service.data.get(const.ATTR_SCHEDULE_ID) or list(engine.records)
+        hass.bus.async_fire(
+            const.EVENT_HISTORY,
+            {
+                const.ATTR_PARTITION: entry_id,
+                const.ATTR_START: start.isoformat(),
+                const.ATTR_END: end.isoformat(),
+                const.ATTR_SCHEDULES: {
+                    schedule_id: engine.history.async_get(schedule_id, start, end)
+                    for schedule_id in schedule_ids
+                },
+            },
+            context=service.context,
+        )
 
     hass.services.async_register(
         const.DOMAIN,
@@ -124,6 +365,7 @@ async def register_services(hass: HomeAssistant):
         add_schedule,
         schema=vol.Schema(
             {
+                vol.Optional(const.ATTR_PARTITION): str,
                 vol.Required(const.ATTR_SCHEDULE_ID): str,
                 vol.Required(const.ATTR_TIME_BEFORE): validate_time_str,
                 vol.Required(const.ATTR_TIME_AFTER): validate_time_str,
@@ -131,6 +373,11 @@ async def register_services(hass: HomeAssistant):
                 vol.Optional(
                     const.ATTR_CONDITION, default=None
                 ): validate_condition_str,
+                vol.Optional(const.ATTR_MONTHS): validate_months,
+                vol.Optional(const.ATTR_DATES): validate_dates,
+                vol.Optional(const.ATTR_DATE_RANGES): validate_date_ranges,
+                vol.Optional(const.ATTR_EXCLUDE_DATES): validate_dates,
+                vol.Optional(const.ATTR_EXPOSE, default=True): cv.boolean,
             }
         ),
     )
@@ -138,19 +385,61 @@ async def register_services(hass: HomeAssistant):
         const.DOMAIN,
         const.SERVICE_DELETE_SCHEDULE,
         delete_schedule,
-        schema=vol.Schema({vol.Required(const.ATTR_SCHEDULE_ID): str}),
+        schema=vol.Schema(
+            {
+                vol.Optional(const.ATTR_PARTITION): str,
+                vol.Required(const.ATTR_SCHEDULE_ID): str,
+            }
+        ),
     )
     hass.services.async_register(
         const.DOMAIN,
         const.SERVICE_UPDATE_SCHEDULE,
         update_schedule,
+        schema=vol.Schema(
+            {vol.Optional(const.ATTR_PARTITION): str, **UPDATE_SCHEDULE_SCHEMA}
+        ),
+    )
+    hass.services.async_register(
+        const.DOMAIN,
+        const.SERVICE_UPDATE_SCHEDULES,
+        update_schedules,
         schema=vol.Schema(
             {
-                vol.Required(const.ATTR_SCHEDULE_ID): str,
-                vol.Optional(const.ATTR_TIME_BEFORE): validate_time_str,
-                vol.Optional(const.ATTR_TIME_AFTER): validate_time_str,
-                vol.Optional(const.ATTR_WEEKDAYS): validate_weekdays,
-                vol.Optional(const.ATTR_CONDITION): validate_condition_str,
+                vol.Optional(const.ATTR_PARTITION): str,
+                vol.Required(const.ATTR_SCHEDULES): [
+                    vol.Schema(UPDATE_SCHEDULE_SCHEMA)
+                ],
+            }
+        ),
+    )
+    hass.services.async_register(
+        const.DOMAIN,
+        const.SERVICE_SIMULATE,
+        simulate,
+        schema=vol.Schema(
+            {
+                vol.Optional(const.ATTR_PARTITION): str,
+                vol.Optional(const.ATTR_SCHEDULE_ID): vol.All(ensure_list, [str]),
+                vol.Optional(const.ATTR_START_DATE): cv.date,
+                vol.Optional(const.ATTR_END_DATE): cv.date,
+                vol.Optional(const.ATTR_HOLIDAYS): validate_dates,
+                vol.Optional(
+                    const.ATTR_OUTPUT, default="schedules_simulation.json"
+                ): str,
+            }
+        ),
+    )
+    hass.services.async_register(
+        const.DOMAIN,
+        const.SERVICE_GET_HISTORY,
+        get_history,
+        schema=vol.Schema(
+            {
+                vol.Optional(const.ATTR_PARTITION): str,
+                vol.Optional(const.ATTR_SCHEDULE_ID): vol.All(ensure_list, [str]),
+                vol.Optional(const.ATTR_START): cv.datetime,
+                vol.Optional(const.ATTR_END): cv.datetime,
             }
         ),
     )
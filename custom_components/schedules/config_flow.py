@@ -4,8 +4,9 @@ import logging
 import voluptuous as vol
 from homeassistant import config_entries
 from homeassistant.core import callback, valid_entity_id
+from homeassistant.util import slugify
 
-from .const import DOMAIN, TITLE
+from .const import CONF_NAME, CONF_PERSIST_HISTORY, DOMAIN, TITLE
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -35,15 +36,21 @@ class SchedulesConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         if user_input is not None:
             if user_input.get("workday_sensor") == " ":
                 user_input["workday_sensor"] = ""  # needed to allow empty value ?!
-            # make sure we're only configured once
-            if self.hass.config_entries.async_entries(DOMAIN):
-                return self.async_abort(reason="already_configured")
+            # every partition (name) can only be configured once
+            name = user_input.pop(CONF_NAME, TITLE)
+            await self.async_set_unique_id(slugify(name))
+            self._abort_if_unique_id_configured()
+            # entries created when this integration was single instance have no
+            # unique_id, partitions are resolved by title as well
+            for entry in self._async_current_entries():
+                if slugify(entry.title) == self.unique_id:
+                    return self.async_abort(reason="already_configured")
             # Validate user input
             if not validate_sensor(user_input.get("workday_sensor")):
                 errors["base"] = "invalid_sensor"
             else:
                 # finish
-                return self.async_create_entry(title=TITLE, data=user_input)
+                return self.async_create_entry(title=name, data=user_input)
 
         default_workday_sensor = ""
         for item in self.hass.states.async_entity_ids("binary_sensor"):
@@ -56,11 +63,12 @@ class SchedulesConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             step_id="user",
             data_schema=vol.Schema(
                 {
+                    vol.Required(CONF_NAME, default=TITLE): str,
                     vol.Required(
                         "workday_sensor", default=default_workday_sensor
                     ): vol.In(
                         [" "] + self.hass.states.async_entity_ids("binary_sensor")
-                    )
+                    ),
                 }
             ),
             errors=errors,
@@ -97,7 +105,13 @@ class SchedulesOptionsFlowHandler(config_entries.OptionsFlow):
                 {
                     vol.Required("workday_sensor", default=workday_sensor): vol.In(
                         [" "] + self.hass.states.async_entity_ids("binary_sensor")
-                    )
+                    ),
+                    vol.Required(
+                        CONF_PERSIST_HISTORY,
+                        default=self.config_entry.options.get(
+                            CONF_PERSIST_HISTORY, False
+                        ),
+                    ): bool,
                 }
             ),
             errors=errors,
@@ -6,16 +6,41 @@ TITLE = "Schedules"
 SERVICE_ADD_SCHEDULE = "add"
 SERVICE_DELETE_SCHEDULE = "delete"
 SERVICE_UPDATE_SCHEDULE = "update"
+SERVICE_UPDATE_SCHEDULES = "update_many"
+SERVICE_SIMULATE = "simulate"
+SERVICE_GET_HISTORY = "get_history"
 
+ATTR_PARTITION = "partition"
 ATTR_SCHEDULE_ID = "schedule_id"
 ATTR_TIME_AFTER = "after"
 ATTR_TIME_BEFORE = "before"
 ATTR_WEEKDAYS = "weekdays"
 ATTR_MONTHS = "months"
+ATTR_DATES = "dates"
+ATTR_DATE_RANGES = "date_ranges"
+ATTR_EXCLUDE_DATES = "exclude_dates"
 ATTR_CONDITION = "condition"
+ATTR_EXPOSE = "expose"
 ATTR_ALL_ACTIVE_SCHEDULES = "all_active"
+ATTR_START_DATE = "start_date"
+ATTR_END_DATE = "end_date"
+ATTR_HOLIDAYS = "holidays"
+ATTR_START = "start"
+ATTR_END = "end"
+ATTR_SCHEDULES = "schedules"
+ATTR_OUTPUT = "output"
+ATTR_STATE = "state"
+ATTR_TIME = "time"
+ATTR_TRANSITIONS = "transitions"
+
+EVENT_TRANSITION = f"{DOMAIN}_transition"
+EVENT_HISTORY = f"{DOMAIN}_history"
 
 DATA_DOMAIN = DOMAIN
-DATA_SCHEDULES = "schedules"
 DATA_STORE = "store"
-DATA_WORKDAY_SENSOR = "workday_sensor"
+DATA_ENGINE = "engine"
+DATA_LISTENERS = "listeners"
+
+CONF_NAME = "name"
+CONF_TO = "to"
+CONF_PERSIST_HISTORY = "persist_history"
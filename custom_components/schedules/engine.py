@@ -0,0 +1,507 @@
+"""Evaluation engine for schedules."""
+import datetime
+import logging
+from typing import Callable, Dict, List, Optional, Set
+
+import attr
+import homeassistant.util.dt as dt_util
+from homeassistant.const import (
+    STATE_OFF,
+    STATE_ON,
+    SUN_EVENT_SUNRISE,
+    SUN_EVENT_SUNSET,
+    WEEKDAYS,
+)
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.condition import async_template as templ_match
+from homeassistant.helpers.condition import time as time_match
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.event import (
+    async_track_state_change,
+    async_track_sunrise,
+    async_track_sunset,
+    async_track_template,
+    async_track_time_change,
+)
+
+from . import const
+from .history import TransitionHistory
+from .store import ScheduleEntry, ScheduleStorage
+from .util import compile_date_rules, compile_time_str, parse_template, parse_time
+
+_LOGGER = logging.getLogger(__name__)
+
+# fields of a schedule per part of the engine that needs to be rebuilt on change
+TIME_FIELDS = (const.ATTR_TIME_AFTER, const.ATTR_TIME_BEFORE)
+CONDITION_FIELDS = (const.ATTR_CONDITION,)
+DATE_FIELDS = (
+    const.ATTR_MONTHS,
+    const.ATTR_DATES,
+    const.ATTR_DATE_RANGES,
+    const.ATTR_EXCLUDE_DATES,
+)
+EVALUATION_FIELDS = (
+    TIME_FIELDS + CONDITION_FIELDS + DATE_FIELDS + (const.ATTR_WEEKDAYS,)
+)
+
+# number of days (today and tomorrow) the day index is precomputed for,
+# the next day is added when the index rolls at midnight
+DAY_INDEX_HORIZON = 2
+SECONDS_PER_DAY = 86400
+
+
+def local_seconds(day: datetime.date, time_val: datetime.time) -> int:
+    """Return (local) wall clock time as integer seconds since 0001-01-01."""
+    return (
+        day.toordinal() * SECONDS_PER_DAY
+        + time_val.hour * 3600
+        + time_val.minute * 60
+        + time_val.second
+    )
+
+
+def weekday_matches(
+    weekdays: List[str], day: datetime.date, is_workday: Optional[bool]
+) -> bool:
+    """Return if the weekdays (including workday/not_workday) match the given day.
+
+    The is_workday argument is None if there is no workday sensor.
+    """
+    if WEEKDAYS[day.weekday()] in weekdays:
+        return True
+    if is_workday is None:
+        return False
+    if is_workday:
+        return "workday" in weekdays
+    return "not_workday" in weekdays
+
+
+class DayIndex:
+    """Per-day index of the schedules whose date rules match that day.
+
+    Date rules (months, dates, date ranges and excluded dates) are evaluated
+    once per schedule per day for today and tomorrow, so evaluating them
+    on state updates is a simple set lookup.
+    Schedules without date rules are not indexed and match every day.
+    """
+
+    def __init__(self, horizon: int = DAY_INDEX_HORIZON) -> None:
+        """Initialize the day index."""
+        self._horizon = horizon
+        self._rules: Dict[str, Callable[[datetime.date], bool]] = {}
+        self._days: Dict[datetime.date, Set[str]] = {}
+        self._start: Optional[datetime.date] = None
+
+    @callback
+    def async_set_rules(
+        self, schedule_id: str, date_rules: Optional[Callable[[datetime.date], bool]]
+    ) -> None:
+        """Set (or replace) the compiled date rules for a schedule."""
+        self.async_remove(schedule_id)
+        if date_rules is None:
+            return
+        self._rules[schedule_id] = date_rules
+        for day, schedule_ids in self._days.items():
+            if date_rules(day):
+                schedule_ids.add(schedule_id)
+
+    @callback
+    def async_remove(self, schedule_id: str) -> None:
+        """Remove a schedule from the index."""
+        if self._rules.pop(schedule_id, None) is None:
+            return
+        for schedule_ids in self._days.values():
+            schedule_ids.discard(schedule_id)
+
+    @callback
+    def async_roll(self, today: datetime.date) -> None:
+        """Move the horizon of the index to start at the given day."""
+        if self._start == today:
+            return
+        for day in [day for day in self._days if day < today]:
+            del self._days[day]
+        for offset in range(self._horizon):
+            day = today + datetime.timedelta(days=offset)
+            if day not in self._days:
+                self._days[day] = {
+                    schedule_id
+                    for schedule_id, date_rules in self._rules.items()
+                    if date_rules(day)
+                }
+        self._start = today
+        _LOGGER.debug("Day index rolled to %s", today)
+
+    def has_rules(self, schedule_id: str) -> bool:
+        """Return if the schedule has any date rules."""
+        return schedule_id in self._rules
+
+    def matches(self, schedule_id: str, day: datetime.date) -> bool:
+        """Return if the date rules of the schedule match the given day."""
+        date_rules = self._rules.get(schedule_id)
+        if date_rules is None:
+            return True
+        schedule_ids = self._days.get(day)
+        if schedule_ids is None:
+            # outside of the horizon
+            return date_rules(day)
+        return schedule_id in schedule_ids
+
+
+@attr.s(slots=True)
+class ScheduleRecord:
+    """Runtime state of a single schedule within the engine.
+
+    Only schedules that are exposed have an entity (binary sensor) attached.
+    """
+
+    schedule_id = attr.ib(type=str)
+    entry = attr.ib(type=ScheduleEntry, default=None)
+    # None until the schedule is evaluated for the first time
+    state = attr.ib(type=bool, default=None)
+    sort_key = attr.ib(type=tuple, default=(0, 0))
+    condition_template = attr.ib(default=None)
+    # remove functions of the time listeners, by field (after/before)
+    time_listeners = attr.ib(type=dict, factory=dict)
+    condition_listener = attr.ib(default=None)
+    entity = attr.ib(default=None)
+
+    @property
+    def uses_workday(self) -> bool:
+        """Return if the schedule depends on the state of the workday sensor."""
+        weekdays = self.entry.weekdays if self.entry else None
+        if not weekdays:
+            return False
+        return "workday" in weekdays or "not_workday" in weekdays
+
+
+class ScheduleEngine:
+    """Evaluate the schedules of a single partition (config entry)."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry_id: str,
+        store: ScheduleStorage,
+        workday_sensor: Optional[str] = None,
+        history: Optional[TransitionHistory] = None,
+    ) -> None:
+        """Initialize the engine."""
+        self.hass = hass
+        self.entry_id = entry_id
+        self.store = store
+        self.history = history or TransitionHistory(hass)
+        self.records: Dict[str, ScheduleRecord] = {}
+        self.day_index = DayIndex()
+        self._workday_sensor = workday_sensor
+        self._workday_listener: Optional[Callable] = None
+        self._midnight_listener: Optional[Callable] = None
+        self._pending_transitions: List[dict] = []
+
+    @property
+    def workday_sensor(self) -> Optional[str]:
+        """Return the workday sensor of this partition."""
+        return self._workday_sensor
+
+    async def async_start(self) -> None:
+        """Load and evaluate all stored schedules."""
+        self.day_index.async_roll(dt_util.now().date())
+        self.__track_workday_sensor()
+        self._midnight_listener = async_track_time_change(
+            self.hass, self.__midnight, 0, 0, 0
+        )
+        for schedule_id in list(self.store.schedules):
+            record = self.records[schedule_id] = ScheduleRecord(schedule_id)
+            await self.async_initialize(record, notify=False)
+        self.__notify_updated()
+
+    @callback
+    def async_stop(self) -> None:
+        """Remove all listeners of the engine and close the history."""
+        for record in self.records.values():
+            self.__deregister_listeners(record)
+        self.history.async_stop(dt_util.utcnow().timestamp())
+        if self._workday_listener is not None:
+            self._workday_listener()
+            self._workday_listener = None
+        if self._midnight_listener is not None:
+            self._midnight_listener()
+            self._midnight_listener = None
+
+    async def async_add(self, schedule_id: str) -> ScheduleRecord:
+        """Add (and evaluate) a stored schedule."""
+        record = self.records[schedule_id] = ScheduleRecord(schedule_id)
+        await self.async_initialize(record)
+        return record
+
+    @callback
+    def async_remove(self, schedule_id: str) -> Optional[ScheduleRecord]:
+        """Remove a schedule from the engine."""
+        record = self.records.pop(schedule_id, None)
+        if record is not None:
+            self.__deregister_listeners(record)
+            self.day_index.async_remove(schedule_id)
+            self.history.async_remove(schedule_id)
+        return record
+
+    async def async_initialize(
+        self, record: ScheduleRecord, notify: bool = True
+    ) -> None:
+        """Run all tasks to initialize a schedule."""
+        record.entry = self.store.async_get(record.schedule_id)
+        self.__deregister_listeners(record)
+        self.__register_condition_template(record)
+        self.__register_date_rules(record)
+        for field in TIME_FIELDS:
+            self.__register_time_listener(record, field)
+        await self.async_update_state(record, notify)
+        _LOGGER.debug("Schedule initialized: %s", record.schedule_id)
+
+    async def async_apply_changes(self, changes: Dict[str, Set[str]]) -> None:
+        """Apply changed fields (by schedule_id) of updated schedules in one pass.
+
+        Only the listeners, condition template and day index affected by
+        the changed fields are rebuilt before the schedule is re-evaluated.
+        """
+        to_evaluate = []
+        for schedule_id, changed in changes.items():
+            record = self.records[schedule_id]
+            record.entry = self.store.async_get(schedule_id)
+            for field in TIME_FIELDS:
+                if field in changed:
+                    self.__register_time_listener(record, field)
+            if changed.intersection(CONDITION_FIELDS):
+                self.__register_condition_template(record)
+            if changed.intersection(DATE_FIELDS):
+                self.__register_date_rules(record)
+            if changed.intersection(EVALUATION_FIELDS):
+                to_evaluate.append(record)
+        await self.async_update_states(to_evaluate)
+
+    async def async_set_workday_sensor(self, workday_sensor: Optional[str]) -> None:
+        """Swap the workday sensor and re-evaluate the schedules using it."""
+        if workday_sensor == self._workday_sensor:
+            return
+        self._workday_sensor = workday_sensor
+        self.__track_workday_sensor()
+        await self.async_update_workday_schedules()
+
+    async def async_update_workday_schedules(self) -> None:
+        """Re-evaluate (only) the schedules that depend on the workday sensor."""
+        await self.async_update_states(
+            [record for record in self.records.values() if record.uses_workday]
+        )
+
+    @callback
+    def __track_workday_sensor(self) -> None:
+        """(Re)subscribe to state changes of the workday sensor."""
+        if self._workday_listener is not None:
+            self._workday_listener()
+            self._workday_listener = None
+        if not self._workday_sensor:
+            return
+
+        @callback
+        def workday_changed(*args, **kwargs):
+            """Handle state change of the workday sensor."""
+            self.hass.async_create_task(self.async_update_workday_schedules())
+
+        self._workday_listener = async_track_state_change(
+            self.hass, self._workday_sensor, workday_changed
+        )
+
+    @callback
+    def __midnight(self, now: datetime.datetime) -> None:
+        """Move the day index along and re-evaluate schedules with date rules."""
+        self.day_index.async_roll(now.date())
+        self.hass.async_create_task(
+            self.async_update_states(
+                [
+                    record
+                    for record in self.records.values()
+                    if self.day_index.has_rules(record.schedule_id)
+                ]
+            )
+        )
+
+    @callback
+    def __deregister_listeners(self, record: ScheduleRecord) -> None:
+        """Make sure that existing listeners are deregistered."""
+        for remove_listener in record.time_listeners.values():
+            remove_listener()
+        record.time_listeners = {}
+        if record.condition_listener is not None:
+            record.condition_listener()
+            record.condition_listener = None
+
+    @callback
+    def __event_fired(self, record: ScheduleRecord):
+        """Return callback that updates a schedule on an event from HomeAssistant."""
+
+        @callback
+        def event_fired(*args, **kwargs):
+            """Handle an event from HomeAssistant as trigger to update the schedule."""
+            _LOGGER.debug("trigger: %s", args)
+            self.hass.async_create_task(self.async_update_state(record))
+
+        return event_fired
+
+    @callback
+    def __register_condition_template(self, record: ScheduleRecord) -> None:
+        """Unpack templated condition and track its state."""
+        if record.condition_listener is not None:
+            record.condition_listener()
+            record.condition_listener = None
+        if record.entry.condition:
+            record.condition_template = parse_template(record.entry.condition)
+            record.condition_template.hass = self.hass
+            record.condition_listener = async_track_template(
+                self.hass, record.condition_template, self.__event_fired(record)
+            )
+        else:
+            record.condition_template = None
+
+    @callback
+    def __register_date_rules(self, record: ScheduleRecord) -> None:
+        """Compile the date rules into the day index."""
+        entry = record.entry
+        self.day_index.async_set_rules(
+            record.schedule_id,
+            compile_date_rules(
+                entry.months, entry.dates, entry.date_ranges, entry.exclude_dates
+            ),
+        )
+
+    @callback
+    def __register_time_listener(self, record: ScheduleRecord, field: str) -> None:
+        """(Re)register the listener that tracks the after or before time."""
+        remove_listener = record.time_listeners.pop(field, None)
+        if remove_listener is not None:
+            remove_listener()
+        time_str = getattr(record.entry, field)
+        event_fired = self.__event_fired(record)
+        sun_event, offset = compile_time_str(time_str)
+        if sun_event == SUN_EVENT_SUNRISE:
+            # sunrise (with or without offset)
+            record.time_listeners[field] = async_track_sunrise(
+                self.hass, event_fired, offset
+            )
+        elif sun_event == SUN_EVENT_SUNSET:
+            # sunset (with or without offset)
+            record.time_listeners[field] = async_track_sunset(
+                self.hass, event_fired, offset
+            )
+        else:
+            # regular time
+            time_val = parse_time(self.hass, time_str)
+            record.time_listeners[field] = async_track_time_change(
+                self.hass,
+                event_fired,
+                time_val.hour,
+                time_val.minute,
+                time_val.second,
+            )
+
+    @staticmethod
+    def __get_sort_key(now, time_after, time_before):
+        """Return (integer) key to sort schedules by their current before and after time."""
+        today = now.date()
+        after_day = today
+        if time_after > time_before:
+            # started yesterday
+            after_day = today - datetime.timedelta(days=1)
+        before_day = today
+        if time_before < now.time():
+            # ends tomorrow
+            before_day = today + datetime.timedelta(days=1)
+        return (
+            local_seconds(before_day, time_before),
+            local_seconds(after_day, time_after),
+        )
+
+    @callback
+    def __set_state(self, record: ScheduleRecord, state: bool) -> None:
+        """Set the state of a schedule, record and queue the transition if it changed."""
+        previous = record.state
+        record.state = state
+        if previous == state:
+            return
+        now = dt_util.utcnow()
+        # the initial state is also kept in the history, to calculate durations
+        self.history.async_record(record.schedule_id, now.timestamp(), state)
+        if previous is None:
+            return
+        if not self._pending_transitions:
+            # all transitions evaluated in this loop iteration go in one event
+            self.hass.loop.call_soon(self.__fire_transitions)
+        self._pending_transitions.append(
+            {
+                const.ATTR_SCHEDULE_ID: record.schedule_id,
+                const.ATTR_STATE: STATE_ON if state else STATE_OFF,
+                const.ATTR_TIME: now.isoformat(),
+            }
+        )
+
+    @callback
+    def __fire_transitions(self) -> None:
+        """Fire a single event for all pending transitions."""
+        transitions = self._pending_transitions
+        self._pending_transitions = []
+        self.hass.bus.async_fire(
+            const.EVENT_TRANSITION,
+            {const.ATTR_PARTITION: self.entry_id, const.ATTR_TRANSITIONS: transitions},
+        )
+
+    @callback
+    def __notify_updated(self, schedule_id: Optional[str] = None) -> None:
+        """Signal that a schedule (or multiple if schedule_id is None) was updated."""
+        async_dispatcher_send(
+            self.hass, f"schedule_updated_{self.entry_id}", schedule_id
+        )
+
+    async def async_update_states(self, records: List[ScheduleRecord]) -> None:
+        """Calculate current state of multiple schedules, notify the update once."""
+        if not records:
+            return
+        for record in records:
+            await self.async_update_state(record, notify=False)
+        self.__notify_updated()
+
+    async def async_update_state(
+        self, record: ScheduleRecord, notify: bool = True
+    ) -> None:
+        """Calculate current state of a schedule.
+
+        If notify is False the caller is responsible for signaling the update.
+        """
+        entry = record.entry
+        if entry is None or entry.before is None or entry.after is None:
+            self.__set_state(record, False)
+            if notify:
+                self.__notify_updated(record.schedule_id)
+            return
+        # weekday/workday match
+        now = dt_util.now()
+        is_workday = None
+        if self._workday_sensor:
+            workday_state = self.hass.states.get(self._workday_sensor)
+            if workday_state is not None:
+                is_workday = workday_state.state == "on"
+        day_matches = weekday_matches(entry.weekdays or [], now.date(), is_workday)
+        # date rules match (precomputed in the day index)
+        if day_matches:
+            day_matches = self.day_index.matches(record.schedule_id, now.date())
+        # time match
+        time_before = parse_time(self.hass, entry.before)
+        time_after = parse_time(self.hass, entry.after)
+        time_matches = time_match(hass=self.hass, before=time_before, after=time_after)
+        record.sort_key = self.__get_sort_key(now, time_after, time_before)
+        # condition match
+        if record.condition_template:
+            cond_matches = templ_match(self.hass, record.condition_template)
+        else:
+            cond_matches = True
+        self.__set_state(record, time_matches and cond_matches and day_matches)
+        if record.entity is not None and record.entity.hass is not None:
+            record.entity.async_write_ha_state()
+        if notify:
+            self.__notify_updated(record.schedule_id)
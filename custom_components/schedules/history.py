@@ -0,0 +1,199 @@
+"""In-memory history of schedule transitions."""
+import datetime
+import logging
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import homeassistant.util.dt as dt_util
+from homeassistant.const import STATE_OFF, STATE_ON
+from homeassistant.core import callback
+from homeassistant.helpers.typing import HomeAssistantType
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+SAVE_DELAY = 60
+# number of transitions kept per schedule
+HISTORY_SIZE = 256
+
+
+class TransitionRingBuffer:
+    """Bounded, array backed buffer of (timestamp, state) transitions."""
+
+    __slots__ = ("_timestamps", "_states", "_start", "_size")
+
+    def __init__(self, capacity: int = HISTORY_SIZE) -> None:
+        """Initialize the ring buffer."""
+        self._timestamps = array("d", [0.0]) * capacity
+        self._states = array("b", [0]) * capacity
+        self._start = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        """Return the number of transitions in the buffer."""
+        return self._size
+
+    def __iter__(self) -> Iterator[Tuple[float, bool]]:
+        """Iterate over the transitions, oldest first."""
+        capacity = len(self._timestamps)
+        for idx in range(self._size):
+            pos = (self._start + idx) % capacity
+            yield self._timestamps[pos], bool(self._states[pos])
+
+    @property
+    def first_timestamp(self) -> Optional[float]:
+        """Return the timestamp of the oldest transition in the buffer."""
+        if not self._size:
+            return None
+        return self._timestamps[self._start]
+
+    @property
+    def last_state(self) -> Optional[bool]:
+        """Return the state of the most recent transition."""
+        if not self._size:
+            return None
+        pos = (self._start + self._size - 1) % len(self._timestamps)
+        return bool(self._states[pos])
+
+    def append(self, timestamp: float, state: bool) -> None:
+        """Add a transition, overwriting the oldest one if the buffer is full."""
+        capacity = len(self._timestamps)
+        if self._size < capacity:
+            pos = (self._start + self._size) % capacity
+            self._size += 1
+        else:
+            pos = self._start
+            self._start = (self._start + 1) % capacity
+        self._timestamps[pos] = timestamp
+        self._states[pos] = state
+
+
+class TransitionHistory:
+    """History of the transitions of all schedules of a partition.
+
+    Optionally persisted (in a storage file next to the schedules) when a
+    storage key is given.
+    """
+
+    def __init__(
+        self, hass: HomeAssistantType, storage_key: Optional[str] = None
+    ) -> None:
+        """Initialize the history."""
+        self._buffers: Dict[str, TransitionRingBuffer] = {}
+        self._store = None
+        if storage_key is not None:
+            self._store = hass.helpers.storage.Store(STORAGE_VERSION, storage_key)
+
+    @property
+    def persisted(self) -> bool:
+        """Return if the history is persisted across restarts."""
+        return self._store is not None
+
+    @callback
+    def async_record(self, schedule_id: str, timestamp: float, state: bool) -> None:
+        """Record a transition of a schedule."""
+        buffer = self._buffers.get(schedule_id)
+        if buffer is None:
+            buffer = self._buffers[schedule_id] = TransitionRingBuffer()
+        elif buffer.last_state == state:
+            return
+        buffer.append(timestamp, state)
+        if self._store is not None:
+            self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def async_stop(self, timestamp: float) -> None:
+        """Record all active schedules as off when Home Assistant stops.
+
+        Otherwise the downtime is counted as active time once the schedules
+        are evaluated again after a restart.
+        """
+        for schedule_id, buffer in self._buffers.items():
+            if buffer.last_state:
+                self.async_record(schedule_id, timestamp, False)
+
+    @callback
+    def async_remove(self, schedule_id: str) -> None:
+        """Remove the history of a schedule."""
+        if self._buffers.pop(schedule_id, None) is not None and self._store:
+            self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def async_get(
+        self,
+        schedule_id: str,
+        start: datetime.datetime,
+        end: datetime.datetime,
+    ) -> dict:
+        """Return the active duration and transitions of a schedule in a period.
+
+        The result is not complete if the period starts before the oldest
+        transition kept in the history (the buffer is bounded).
+        """
+        buffer = self._buffers.get(schedule_id)
+        first_ts = buffer.first_timestamp if buffer is not None else None
+        start_ts = start.timestamp()
+        end_ts = min(end.timestamp(), dt_util.utcnow().timestamp())
+        active_seconds = 0.0
+        transitions: List[list] = []
+        on_since: Optional[float] = None
+        for timestamp, state in buffer or []:
+            if timestamp > end_ts:
+                break
+            if timestamp >= start_ts:
+                transitions.append(
+                    [
+                        dt_util.utc_from_timestamp(timestamp).isoformat(),
+                        STATE_ON if state else STATE_OFF,
+                    ]
+                )
+            if state and on_since is None:
+                on_since = max(timestamp, start_ts)
+            elif not state and on_since is not None:
+                active_seconds += max(timestamp - on_since, 0)
+                on_since = None
+        if on_since is not None:
+            active_seconds += max(end_ts - on_since, 0)
+        return {
+            "active_seconds": round(active_seconds),
+            "transitions": transitions,
+            "complete": first_ts is not None and first_ts <= start_ts,
+            "since": (
+                dt_util.utc_from_timestamp(first_ts).isoformat()
+                if first_ts is not None
+                else None
+            ),
+        }
+
+    async def async_load(self) -> None:
+        """Load the persisted history."""
+        if self._store is None:
+            return
+        data = await self._store.async_load()
+        if data is None:
+            return
+        for schedule_id, transitions in data["schedules"].items():
+            buffer = self._buffers[schedule_id] = TransitionRingBuffer()
+            for timestamp, state in transitions:
+                buffer.append(timestamp, state)
+
+    async def async_save(self) -> None:
+        """Save the history (if persisted)."""
+        if self._store is not None:
+            await self._store.async_save(self._data_to_save())
+
+    async def async_remove_storage(self) -> None:
+        """Remove the persisted history from disk."""
+        self._buffers = {}
+        if self._store is not None:
+            await self._store.async_remove()
+
+    @callback
+    def _data_to_save(self) -> dict:
+        """Return data of the history to store in a file."""
+        return {
+            "schedules": {
+                schedule_id: [[timestamp, state] for timestamp, state in buffer]
+                for schedule_id, buffer in self._buffers.items()
+            }
+        }
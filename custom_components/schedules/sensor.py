@@ -1,46 +1,54 @@
 """Sensor which lists the (first) active schedule."""
 
-import datetime
 import logging
+from operator import attrgetter
 
-import homeassistant.util.dt as dt_util
 from homeassistant.core import callback
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity import Entity
 
 from . import const
-from .util import parse_time
 
 _LOGGER = logging.getLogger(__name__)
 
 
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """Set up sensor from config entry."""
-    sensor = ActiveScheduleSensor(hass)
-    async_add_entities([sensor])
-
-    @callback
-    def async_sensor_callback(schedule_id):
-        """Handle callback when a schedule state changes."""
-        sensor.schedule_update_ha_state()
-
-    async_dispatcher_connect(hass, "schedule_updated", async_sensor_callback)
+    async_add_entities([ActiveScheduleSensor(hass, config_entry)])
 
 
 class ActiveScheduleSensor(Entity):
     """Representation of the active schedule sensor."""
 
-    def __init__(self, hass):
+    def __init__(self, hass, config_entry):
         """Initialize entity."""
         self.hass = hass
+        self._config_entry = config_entry
+        self._active_schedules = []
+
+    async def async_added_to_hass(self):
+        """Compute the active schedules and track updates of the schedules."""
+        self._active_schedules = self.get_all_active_schedules()
+
+        @callback
+        def async_sensor_callback(schedule_id):
+            """Handle callback when a schedule state changes."""
+            self.async_update_active_schedules()
+
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                f"schedule_updated_{self._config_entry.entry_id}",
+                async_sensor_callback,
+            )
+        )
 
     @property
     def state(self):
         """Return state of the sensor."""
         # simply return the first active schedule
-        active_scheds = self.get_all_active_schedules()
-        if active_scheds:
-            return active_scheds[0]
+        if self._active_schedules:
+            return self._active_schedules[0]
         return None
 
     @property
@@ -51,53 +59,35 @@ class ActiveScheduleSensor(Entity):
     @callback
     def get_all_active_schedules(self):
         """Return all active scheduleid's as list, sorted by time/date."""
-        active_schedules = []
-        all_scheds = list(
-            self.hass.data[const.DATA_DOMAIN][const.DATA_SCHEDULES].values()
-        )
-        # sort schedules by time/date and list all active ones
-        all_scheds.sort(key=self.__get_after_sort_time)
-        all_scheds.sort(key=self.__get_before_sort_time)
-        for sched in all_scheds:
-            if sched.is_on:
-                active_schedules.append(sched.schedule_id)
-        return active_schedules
+        engine = self.hass.data[const.DATA_DOMAIN][self._config_entry.entry_id][
+            const.DATA_ENGINE
+        ]
+        active_scheds = [sched for sched in engine.records.values() if sched.state]
+        # sort key is precomputed by the engine when the state is evaluated
+        active_scheds.sort(key=attrgetter("sort_key"))
+        return [sched.schedule_id for sched in active_scheds]
+
+    @callback
+    def async_update_active_schedules(self):
+        """Update the list of active schedules and write state."""
+        self._active_schedules = self.get_all_active_schedules()
+        self.async_write_ha_state()
 
     @property
     def device_state_attributes(self):
         """Return the device specific state attributes."""
-        return {const.ATTR_ALL_ACTIVE_SCHEDULES: self.get_all_active_schedules()}
+        return {const.ATTR_ALL_ACTIVE_SCHEDULES: self._active_schedules}
 
     @property
     def name(self):
         """Return the name of the entity."""
-        return "Active Schedule Sensor"
+        if self._config_entry.unique_id is None:
+            return "Active Schedule Sensor"
+        return f"Active Schedule Sensor {self._config_entry.title}"
 
     @property
     def unique_id(self):
         """Return the unique_id of the entity."""
-        return "ActiveScheduleSensor"
-
-    def __get_after_sort_time(self, sched):
-        """Get the true timestamp for the after-time for sorting."""
-        if sched.after is None or sched.before is None:
-            return 0
-        sched_before = parse_time(self.hass, sched.before)
-        sched_after = parse_time(self.hass, sched.after)
-        if sched_after > sched_before:
-            yesterday = (dt_util.now() - datetime.timedelta(days=1)).date()
-            return datetime.datetime.combine(yesterday, sched_after)
-        return datetime.datetime.combine(dt_util.now(), sched_after)
-
-    def __get_before_sort_time(self, sched):
-        """Get the true timestamp for the before-time for sorting."""
-        if sched.after is None or sched.before is None:
-            return 0
-        sched_before_time = parse_time(self.hass, sched.before)
-        sched_before = datetime.datetime.combine(
-            datetime.datetime.now(), sched_before_time
-        )
-        if dt_util.as_local(sched_before) < dt_util.now():
-            tomorrow = (dt_util.now() + datetime.timedelta(days=1)).date()
-            sched_before = datetime.datetime.combine(tomorrow, sched_before_time)
-        return sched_before
+        if self._config_entry.unique_id is None:
+            return "ActiveScheduleSensor"
+        return f"ActiveScheduleSensor_{self._config_entry.unique_id}"
@@ -0,0 +1,277 @@
+"""Offline simulation (dry-run) of the on/off timeline of schedules.
+
+Can be used through the simulate service or standalone, e.g.:
+
+    python -m custom_components.schedules.simulate .storage/schedules.storage \
+        --latitude 52.37 --longitude 4.89 --time-zone Europe/Amsterdam \
+        --start 2021-01-01 --end 2021-12-31
+"""
+import argparse
+import datetime
+import json
+import logging
+import sys
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import homeassistant.util.dt as dt_util
+from homeassistant.const import WEEKDAYS
+
+from .engine import SECONDS_PER_DAY, weekday_matches
+from .store import ScheduleEntry, entry_from_dict
+from .util import compile_date_rules, compile_time_str
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_WORKDAYS = WEEKDAYS[:5]
+
+# returns the (utc) datetime of a sun event on a given date
+SunEventFunc = Callable[[str, datetime.date], Optional[datetime.datetime]]
+# (local seconds since 0001-01-01, new state)
+Transition = Tuple[int, bool]
+
+
+def get_astral_location(
+    latitude: float, longitude: float, elevation: float, time_zone: str
+):
+    """Return astral location for the given coordinates."""
+    # pylint: disable=import-outside-toplevel
+    from astral import Location
+
+    return Location(("", "", latitude, longitude, time_zone, elevation))
+
+
+def astral_sun_event_func(location) -> SunEventFunc:
+    """Return sun event function for an astral location."""
+    # pylint: disable=import-outside-toplevel
+    from astral import AstralError
+
+    def sun_event(sun_event: str, day: datetime.date):
+        try:
+            return getattr(location, sun_event)(day, local=False)
+        except AstralError:
+            # sun event never occurs on this date
+            return None
+
+    return sun_event
+
+
+class ScheduleSimulator:
+    """Simulate the on/off timeline of schedules over a date range.
+
+    Uses the same compiled time strings, weekday and date rules as the
+    binary sensors. Templated conditions can not be evaluated offline
+    and are considered to always match. Workdays are derived from the
+    given workdays and holidays instead of a workday sensor.
+    """
+
+    def __init__(
+        self,
+        sun_event_func: SunEventFunc,
+        workdays: Iterable[str] = DEFAULT_WORKDAYS,
+        holidays: Optional[List[str]] = None,
+    ) -> None:
+        """Initialize the simulator."""
+        self._sun_event_func = sun_event_func
+        self._workdays = set(workdays)
+        self._is_holiday = compile_date_rules(dates=holidays)
+        self._sun_cache: Dict[Tuple[str, datetime.date], Optional[int]] = {}
+
+    def simulate(
+        self,
+        entries: Iterable[ScheduleEntry],
+        start: datetime.date,
+        end: datetime.date,
+    ) -> Dict[str, List[Transition]]:
+        """Return the transitions of all schedules between start and end (inclusive)."""
+        days = [
+            start + datetime.timedelta(days=offset)
+            for offset in range((end - start).days + 1)
+        ]
+        workdays = [self._is_workday(day) for day in days]
+        return {
+            entry.schedule_id: self.simulate_schedule(entry, days, workdays)
+            for entry in entries
+        }
+
+    def simulate_schedule(
+        self,
+        entry: ScheduleEntry,
+        days: List[datetime.date],
+        workdays: List[bool],
+    ) -> List[Transition]:
+        """Return the transitions of a single schedule for the given (sorted) days."""
+        if entry.after is None or entry.before is None:
+            return []
+        if entry.condition:
+            _LOGGER.debug(
+                "Condition of schedule %s is ignored in simulation", entry.schedule_id
+            )
+        after_spec = compile_time_str(entry.after)
+        before_spec = compile_time_str(entry.before)
+        date_rules = compile_date_rules(
+            entry.months, entry.dates, entry.date_ranges, entry.exclude_dates
+        )
+        weekdays = entry.weekdays or []
+        transitions: List[Transition] = []
+        for day, is_workday in zip(days, workdays):
+            if not weekday_matches(weekdays, day, is_workday):
+                continue
+            if date_rules is not None and not date_rules(day):
+                continue
+            after = self._resolve(after_spec, day)
+            before = self._resolve(before_spec, day)
+            if after is None or before is None:
+                continue
+            base = day.toordinal() * SECONDS_PER_DAY
+            if after < before:
+                self._sweep(transitions, base + after, base + before)
+            else:
+                # schedule wraps around midnight
+                self._sweep(transitions, base, base + before)
+                self._sweep(transitions, base + after, base + SECONDS_PER_DAY)
+        return transitions
+
+    @staticmethod
+    def _sweep(transitions: List[Transition], start: int, end: int) -> None:
+        """Append an (ordered) interval, merging it with the previous one if they touch."""
+        if start >= end:
+            return
+        if transitions and transitions[-1][0] >= start:
+            transitions[-1] = (max(transitions[-1][0], end), False)
+            return
+        transitions.append((start, True))
+        transitions.append((end, False))
+
+    def _is_workday(self, day: datetime.date) -> bool:
+        """Return if the given day is a workday."""
+        if WEEKDAYS[day.weekday()] not in self._workdays:
+            return False
+        return self._is_holiday is None or not self._is_holiday(day)
+
+    def _resolve(
+        self, time_spec: Tuple[Optional[str], datetime.timedelta], day: datetime.date
+    ) -> Optional[int]:
+        """Resolve compiled time string into local seconds since midnight."""
+        sun_event, offset = time_spec
+        if sun_event is None:
+            return int(offset.total_seconds())
+        key = (sun_event, day)
+        if key not in self._sun_cache:
+            event_time = self._sun_event_func(sun_event, day)
+            if event_time is None:
+                self._sun_cache[key] = None
+            else:
+                local = dt_util.as_local(event_time)
+                self._sun_cache[key] = (
+                    local.hour * 3600 + local.minute * 60 + local.second
+                )
+        seconds = self._sun_cache[key]
+        if seconds is None:
+            return None
+        return (seconds + int(offset.total_seconds())) % SECONDS_PER_DAY
+
+
+def _localize(naive: datetime.datetime) -> datetime.datetime:
+    """Return (naive) local datetime as timezone aware datetime."""
+    time_zone = dt_util.DEFAULT_TIME_ZONE
+    if hasattr(time_zone, "localize"):
+        return time_zone.localize(naive)
+    return naive.replace(tzinfo=time_zone)
+
+
+def _day_format(ordinal: int) -> Optional[Tuple[str, str]]:
+    """Return (date, utc offset) isoformat strings of a local day.
+
+    Returns None if the utc offset changes during the day (DST).
+    """
+    midnight = _localize(datetime.datetime.fromordinal(ordinal))
+    next_midnight = _localize(
+        datetime.datetime.fromordinal(ordinal) + datetime.timedelta(days=1)
+    )
+    if midnight.utcoffset() != next_midnight.utcoffset():
+        return None
+    # e.g. 2021-01-01T00:00:00+01:00
+    isoformat = midnight.isoformat()
+    return isoformat[:11], isoformat[19:]
+
+
+def transition_time(seconds: int) -> datetime.datetime:
+    """Return the (local, timezone aware) datetime of a transition."""
+    return _localize(
+        datetime.datetime.fromordinal(seconds // SECONDS_PER_DAY)
+        + datetime.timedelta(seconds=seconds % SECONDS_PER_DAY)
+    )
+
+
+def timeline_as_dict(timeline: Dict[str, List[Transition]]) -> dict:
+    """Return the simulated timeline in a JSON serializable format.
+
+    The date and utc offset are formatted once per day, only transitions
+    on days with a DST change are localized one by one.
+    """
+    day_formats: Dict[int, Optional[Tuple[str, str]]] = {}
+
+    def isoformat(seconds: int) -> str:
+        ordinal, day_seconds = divmod(seconds, SECONDS_PER_DAY)
+        if ordinal not in day_formats:
+            day_formats[ordinal] = _day_format(ordinal)
+        day_format = day_formats[ordinal]
+        if day_format is None:
+            return transition_time(seconds).isoformat()
+        minutes, second = divmod(day_seconds, 60)
+        hour, minute = divmod(minutes, 60)
+        return f"{day_format[0]}{hour:02d}:{minute:02d}:{second:02d}{day_format[1]}"
+
+    result = {}
+    for schedule_id, transitions in timeline.items():
+        result[schedule_id] = {
+            "active_seconds": sum(
+                transitions[idx + 1][0] - transitions[idx][0]
+                for idx in range(0, len(transitions), 2)
+            ),
+            "transitions": [
+                [isoformat(seconds), "on" if state else "off"]
+                for seconds, state in transitions
+            ],
+        }
+    return result
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the simulation from the command line."""
+    parser = argparse.ArgumentParser(description="Simulate schedules offline.")
+    parser.add_argument("storage", help="path to the schedules storage file")
+    parser.add_argument("--latitude", type=float, required=True)
+    parser.add_argument("--longitude", type=float, required=True)
+    parser.add_argument("--elevation", type=float, default=0)
+    parser.add_argument("--time-zone", required=True)
+    parser.add_argument("--start", type=dt_util.parse_date, required=True)
+    parser.add_argument("--end", type=dt_util.parse_date)
+    parser.add_argument("--schedule", action="append", help="limit to schedule id")
+    parser.add_argument("--workdays", nargs="*", default=DEFAULT_WORKDAYS)
+    parser.add_argument("--holidays", nargs="*", help="(recurring) holiday dates")
+    args = parser.parse_args(argv)
+
+    dt_util.set_default_time_zone(dt_util.get_time_zone(args.time_zone))
+    location = get_astral_location(
+        args.latitude, args.longitude, args.elevation, args.time_zone
+    )
+    with open(args.storage, encoding="utf-8") as storage_file:
+        data = json.load(storage_file)
+    # accept both the storage file and the bare storage data
+    data = data.get("data", data)
+    entries = [
+        entry_from_dict(item)
+        for item in data["schedules"]
+        if not args.schedule or item["schedule_id"] in args.schedule
+    ]
+    simulator = ScheduleSimulator(
+        astral_sun_event_func(location), args.workdays, args.holidays
+    )
+    timeline = simulator.simulate(entries, args.start, args.end or args.start)
+    json.dump(timeline_as_dict(timeline), sys.stdout, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
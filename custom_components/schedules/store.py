@@ -2,9 +2,10 @@
 import logging
 import time
 from collections import OrderedDict
-from typing import MutableMapping, cast
+from typing import Dict, MutableMapping, Set, cast
 
 import attr
+from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import callback
 from homeassistant.helpers.typing import HomeAssistantType
 from homeassistant.loader import bind_hass
@@ -29,16 +30,37 @@ class ScheduleEntry:
     before = attr.ib(type=str, default=None)
     weekdays = attr.ib(type=list, default=None)
     condition = attr.ib(type=str, default=None)
+    months = attr.ib(type=list, default=None)
+    dates = attr.ib(type=list, default=None)
+    date_ranges = attr.ib(type=list, default=None)
+    exclude_dates = attr.ib(type=list, default=None)
+    expose = attr.ib(type=bool, default=True)
+
+
+def entry_from_dict(schedule: dict) -> ScheduleEntry:
+    """Create a ScheduleEntry from its stored representation."""
+    return ScheduleEntry(
+        schedule_id=schedule["schedule_id"],
+        after=schedule["after"],
+        before=schedule["before"],
+        weekdays=schedule["weekdays"],
+        condition=schedule.get("condition", None),
+        months=schedule.get("months", None),
+        dates=schedule.get("dates", None),
+        date_ranges=schedule.get("date_ranges", None),
+        exclude_dates=schedule.get("exclude_dates", None),
+        expose=schedule.get("expose", True),
+    )
 
 
 class ScheduleStorage:
     """Class to hold a registry of schedules."""
 
-    def __init__(self, hass: HomeAssistantType) -> None:
+    def __init__(self, hass: HomeAssistantType, key: str = STORAGE_KEY) -> None:
         """Initialize the schedule storage."""
         self.hass = hass
         self.schedules: MutableMapping[str, ScheduleEntry] = {}
-        self._store = hass.helpers.storage.Store(STORAGE_VERSION, STORAGE_KEY)
+        self._store = hass.helpers.storage.Store(STORAGE_VERSION, key)
 
     @callback
     def async_get(self, schedule_id) -> ScheduleEntry:
@@ -47,7 +69,17 @@ class ScheduleStorage:
 
     @callback
     def async_create(
-        self, schedule_id, after, before, weekdays, condition
+        self,
+        schedule_id,
+        after,
+        before,
+        weekdays,
+        condition,
+        months=None,
+        dates=None,
+        date_ranges=None,
+        exclude_dates=None,
+        expose=True,
     ) -> ScheduleEntry:
         """Create a new ScheduleEntry."""
         if schedule_id in self.schedules:
@@ -58,6 +90,11 @@ class ScheduleStorage:
             before=before,
             weekdays=weekdays,
             condition=condition,
+            months=months,
+            dates=dates,
+            date_ranges=date_ranges,
+            exclude_dates=exclude_dates,
+            expose=expose,
         )
         self.schedules[schedule_id] = new_sched
         self.async_schedule_save()
@@ -73,12 +110,35 @@ class ScheduleStorage:
         return False
 
     @callback
-    def async_update(self, schedule_id: str, changes: dict) -> ScheduleEntry:
-        """Update existing ScheduleEntry."""
-        old = self.schedules[schedule_id]
-        new = self.schedules[schedule_id] = attr.evolve(old, **changes)
-        self.async_schedule_save()
-        return new
+    def async_update(self, schedule_id: str, changes: dict) -> Set[str]:
+        """Update existing ScheduleEntry, return the names of the changed fields."""
+        return self.async_update_many({schedule_id: changes})[schedule_id]
+
+    @callback
+    def async_update_many(self, updates: Dict[str, dict]) -> Dict[str, Set[str]]:
+        """Update multiple ScheduleEntries, return the changed fields by schedule_id.
+
+        Either all or none of the entries are updated, raises KeyError if
+        any of the schedules does not exist.
+        """
+        result = {}
+        new_entries = {}
+        for schedule_id, changes in updates.items():
+            old = self.schedules[schedule_id]
+            changed = {
+                key
+                for key, value in changes.items()
+                if key != "schedule_id" and getattr(old, key) != value
+            }
+            if changed:
+                new_entries[schedule_id] = attr.evolve(
+                    old, **{key: changes[key] for key in changed}
+                )
+            result[schedule_id] = changed
+        if new_entries:
+            self.schedules.update(new_entries)
+            self.async_schedule_save()
+        return result
 
     async def async_load(self) -> None:
         """Load the registry of schedule entries."""
@@ -87,13 +147,7 @@ class ScheduleStorage:
 
         if data is not None:
             for schedule in data["schedules"]:
-                schedules[schedule["schedule_id"]] = ScheduleEntry(
-                    schedule_id=schedule["schedule_id"],
-                    after=schedule["after"],
-                    before=schedule["before"],
-                    weekdays=schedule["weekdays"],
-                    condition=schedule.get("condition", None),
-                )
+                schedules[schedule["schedule_id"]] = entry_from_dict(schedule)
         self.schedules = schedules
 
     @callback
@@ -105,6 +159,11 @@ class ScheduleStorage:
         """Save the registry of schedules."""
         await self._store.async_save(self._data_to_save())
 
+    async def async_remove_storage(self) -> None:
+        """Remove the registry of schedules from disk."""
+        self.schedules = OrderedDict()
+        await self._store.async_remove()
+
     @callback
     def _data_to_save(self) -> dict:
         """Return data for the registry of schedules to store in a file."""
@@ -116,24 +175,56 @@ class ScheduleStorage:
                 "before": entry.before,
                 "weekdays": entry.weekdays,
                 "condition": entry.condition,
+                "months": entry.months,
+                "dates": entry.dates,
+                "date_ranges": entry.date_ranges,
+                "exclude_dates": entry.exclude_dates,
+                "expose": entry.expose,
             }
             for entry in self.schedules.values()
         ]
         return data
 
 
+def get_storage_key(entry: ConfigEntry) -> str:
+    """Return the storage key for the partition of a config entry."""
+    if entry.unique_id is None:
+        # entry created when this integration was single instance
+        return STORAGE_KEY
+    return f"{STORAGE_KEY}.{entry.unique_id}"
+
+
+def get_history_storage_key(entry: ConfigEntry) -> str:
+    """Return the storage key for the (persisted) history of a config entry."""
+    return f"{get_storage_key(entry)}.history"
+
+
 @bind_hass
-async def async_get_registry(hass: HomeAssistantType) -> ScheduleStorage:
-    """Return schedule storage instance."""
-    task = hass.data.get(DATA_REGISTRY)
+async def async_get_registry(
+    hass: HomeAssistantType, entry: ConfigEntry
+) -> ScheduleStorage:
+    """Return schedule storage instance for the partition of a config entry."""
+    registries = hass.data.setdefault(DATA_REGISTRY, {})
+    task = registries.get(entry.entry_id)
 
     if task is None:
 
         async def _load_reg() -> ScheduleStorage:
-            registry = ScheduleStorage(hass)
+            registry = ScheduleStorage(hass, get_storage_key(entry))
             await registry.async_load()
             return registry
 
-        task = hass.data[DATA_REGISTRY] = hass.async_create_task(_load_reg())
+        task = registries[entry.entry_id] = hass.async_create_task(_load_reg())
 
     return cast(ScheduleStorage, await task)
+
+
+@bind_hass
+async def async_remove_registry(hass: HomeAssistantType, entry: ConfigEntry) -> None:
+    """Remove schedule storage of the partition of a config entry from disk."""
+    task = hass.data.get(DATA_REGISTRY, {}).pop(entry.entry_id, None)
+    if task is not None:
+        registry = cast(ScheduleStorage, await task)
+    else:
+        registry = ScheduleStorage(hass, get_storage_key(entry))
+    await registry.async_remove_storage()
@@ -0,0 +1,79 @@
+"""Automation trigger on schedule transitions.
+
+Example:
+    trigger:
+      platform: schedules
+      schedule_id: working hours
+      to: "on"
+"""
+import logging
+
+import voluptuous as vol
+from homeassistant.const import CONF_PLATFORM, STATE_OFF, STATE_ON
+from homeassistant.core import HassJob, callback
+
+from . import const
+from .util import ensure_list
+
+_LOGGER = logging.getLogger(__name__)
+
+TRIGGER_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_PLATFORM): const.DOMAIN,
+        vol.Optional(const.ATTR_SCHEDULE_ID): vol.All(ensure_list, [str]),
+        vol.Optional(const.CONF_TO): vol.In([STATE_ON, STATE_OFF]),
+        vol.Optional(const.ATTR_PARTITION): str,
+    }
+)
+
+
+async def async_validate_trigger_config(hass, config):
+    """Validate trigger config."""
+    return TRIGGER_SCHEMA(config)
+
+
+async def async_attach_trigger(hass, config, action, automation_info):
+    """Listen for schedule transitions based on configuration."""
+    schedule_ids = config.get(const.ATTR_SCHEDULE_ID)
+    to_state = config.get(const.CONF_TO)
+    partition = config.get(const.ATTR_PARTITION)
+    job = HassJob(action)
+
+    @callback
+    def handle_event(event):
+        """Handle a (batched) transition event."""
+        entry_id = event.data[const.ATTR_PARTITION]
+        if partition and not _partition_matches(hass, entry_id, partition):
+            return
+        for transition in event.data[const.ATTR_TRANSITIONS]:
+            schedule_id = transition[const.ATTR_SCHEDULE_ID]
+            if schedule_ids and schedule_id not in schedule_ids:
+                continue
+            if to_state and transition[const.ATTR_STATE] != to_state:
+                continue
+            hass.async_run_hass_job(
+                job,
+                {
+                    "trigger": {
+                        "platform": const.DOMAIN,
+                        const.ATTR_PARTITION: entry_id,
+                        const.ATTR_SCHEDULE_ID: schedule_id,
+                        const.ATTR_STATE: transition[const.ATTR_STATE],
+                        const.ATTR_TIME: transition[const.ATTR_TIME],
+                        "description": f"schedule {schedule_id} turned "
+                        f"{transition[const.ATTR_STATE]}",
+                    }
+                },
+                event.context,
+            )
+
+    return hass.bus.async_listen(const.EVENT_TRANSITION, handle_event)
+
+
+@callback
+def _partition_matches(hass, entry_id, partition):
+    """Return if the partition (entry_id, unique_id or title) is the config entry."""
+    entry = hass.config_entries.async_get_entry(entry_id)
+    if entry is None:
+        return False
+    return partition in (entry.entry_id, entry.unique_id, entry.title)
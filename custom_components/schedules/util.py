@@ -1,8 +1,9 @@
 """Utiliies and helpers."""
+from datetime import date as date_sys
 from datetime import datetime as datetime_sys
 from datetime import time as time_sys
 from datetime import timedelta
-from typing import List, TypeVar, Union, cast
+from typing import Callable, List, Optional, Tuple, TypeVar, Union, cast
 
 import homeassistant.helpers.config_validation as cv
 import homeassistant.util.dt as dt_util
@@ -79,43 +80,41 @@ def parse_sun_event(hass: HomeAssistant, time_str: str):
     return sun_event.strip(), offset
 
 
-def parse_time(hass: HomeAssistant, time_str: str) -> time_sys:
-    """Transform timestring into time object."""
-    time_val = None
-    time_str = str(time_str)
-    time_str = time_str.strip()
+def compile_time_str(time_str: str) -> Tuple[Optional[str], timedelta]:
+    """Compile timestring into a (sun_event, offset) tuple.
 
+    For regular timestrings the sun_event is None and the offset is the
+    time since midnight.
+    """
+    time_str = str(time_str).strip()
     if SUN_EVENT_SUNRISE in time_str or SUN_EVENT_SUNSET in time_str:
-        # timestring with sun event (with or without offset)
-        utcnow = dt_util.utcnow()
-        today = dt_util.as_local(utcnow).date()
-        tomorrow = dt_util.as_local(utcnow + timedelta(days=1)).date()
+        return parse_sun_event(None, time_str)
+    time_val = dt_util.parse_time(time_str)
+    return (
+        None,
+        timedelta(
+            hours=time_val.hour, minutes=time_val.minute, seconds=time_val.second
+        ),
+    )
 
-        # parse sun event and offset
-        sun_event, offset = parse_sun_event(hass, time_str)
-
-        if sun_event == SUN_EVENT_SUNRISE:
-            # grab correct time for sunrise
-            time_val = get_astral_event_date(hass, SUN_EVENT_SUNRISE, today)
-            if today > dt_util.as_local(cast(datetime_sys, time_val)).date():
-                time_val = get_astral_event_date(hass, SUN_EVENT_SUNRISE, tomorrow)
-        elif sun_event == SUN_EVENT_SUNSET:
-            # grab correct time for sunset
-            time_val = get_astral_event_date(hass, SUN_EVENT_SUNSET, today)
-            if today > dt_util.as_local(cast(datetime_sys, time_val)).date():
-                time_val = get_astral_event_date(hass, SUN_EVENT_SUNRISE, tomorrow)
-        else:
-            raise ValueError("Error parsing time string: %s" % time_str)
-        # append offset to time_val
-        time_val = time_val + offset
-        # translate utc to local
-        time_val = dt_util.as_local(time_val)
-        # we only want the time object
-        time_val = time_val.time()
-    else:
+
+def parse_time(hass: HomeAssistant, time_str: str) -> time_sys:
+    """Transform timestring into (today's) time object."""
+    sun_event, offset = compile_time_str(time_str)
+    if sun_event is None:
         # regular timestring 00:00:00
-        time_val = dt_util.parse_time(time_str)
-    return time_val
+        return (datetime_sys.min + offset).time()
+    if sun_event not in (SUN_EVENT_SUNRISE, SUN_EVENT_SUNSET):
+        raise ValueError("Error parsing time string: %s" % time_str)
+    # timestring with sun event (with or without offset)
+    utcnow = dt_util.utcnow()
+    today = dt_util.as_local(utcnow).date()
+    time_val = get_astral_event_date(hass, sun_event, today)
+    if today > dt_util.as_local(cast(datetime_sys, time_val)).date():
+        tomorrow = dt_util.as_local(utcnow + timedelta(days=1)).date()
+        time_val = get_astral_event_date(hass, sun_event, tomorrow)
+    # append offset and translate utc to local, we only want the time object
+    return dt_util.as_local(cast(datetime_sys, time_val) + offset).time()
 
 
 def ensure_list(value: Union[T, List[T], None]) -> List[T]:
@@ -127,5 +126,104 @@ def ensure_list(value: Union[T, List[T], None]) -> List[T]:
     return [item.strip() for item in value.split(",")]
 
 
+def parse_date_str(date_str: str) -> Tuple[Optional[int], int, int]:
+    """Transform datestring (YYYY-MM-DD or recurring MM-DD) into (year, month, day)."""
+    parts = [int(part) for part in str(date_str).strip().split("-")]
+    if len(parts) == 2:
+        # recurring date, validate against a leap year to allow 02-29
+        date_sys(2000, parts[0], parts[1])
+        return None, parts[0], parts[1]
+    if len(parts) == 3:
+        date_sys(parts[0], parts[1], parts[2])
+        return parts[0], parts[1], parts[2]
+    raise ValueError("Error parsing date string: %s" % date_str)
+
+
+def parse_date_range_str(range_str: str):
+    """Transform date range string (start/end) into a tuple of parsed dates."""
+    start_str, end_str = str(range_str).split("/")
+    start = parse_date_str(start_str)
+    end = parse_date_str(end_str)
+    if (start[0] is None) != (end[0] is None):
+        raise ValueError("Can not mix recurring and specific dates: %s" % range_str)
+    return start, end
+
+
+def validate_date_str(date_str):
+    """Validate the given date string."""
+    try:
+        parse_date_str(date_str)
+        return str(date_str).strip()
+    except ValueError as exc:
+        raise vol.Invalid(f"invalid date string: {date_str}") from exc
+
+
+def validate_date_range_str(range_str):
+    """Validate the given date range string."""
+    try:
+        parse_date_range_str(range_str)
+        return str(range_str).replace(" ", "")
+    except ValueError as exc:
+        raise vol.Invalid(f"invalid date range: {range_str}") from exc
+
+
+def _date_matcher(date_str: str) -> Callable[[date_sys], bool]:
+    """Return matcher for a single (recurring) date."""
+    year, month, day = parse_date_str(date_str)
+    if year is None:
+        return lambda value: value.month == month and value.day == day
+    fixed = date_sys(year, month, day)
+    return lambda value: value == fixed
+
+
+def _date_range_matcher(range_str: str) -> Callable[[date_sys], bool]:
+    """Return matcher for a (recurring) date range, both ends inclusive."""
+    start, end = parse_date_range_str(range_str)
+    if start[0] is not None:
+        start_date = date_sys(*start)
+        end_date = date_sys(*end)
+        return lambda value: start_date <= value <= end_date
+    start_md = start[1:]
+    end_md = end[1:]
+    if start_md <= end_md:
+        return lambda value: start_md <= (value.month, value.day) <= end_md
+    # recurring range wraps around the year end (e.g. 12-01/02-28)
+    return lambda value: not end_md < (value.month, value.day) < start_md
+
+
+def compile_date_rules(
+    months: Optional[List[int]] = None,
+    dates: Optional[List[str]] = None,
+    date_ranges: Optional[List[str]] = None,
+    exclude_dates: Optional[List[str]] = None,
+) -> Optional[Callable[[date_sys], bool]]:
+    """Compile the date rules of a schedule into a single matcher function.
+
+    Returns None if the schedule has no date rules (matches every day).
+    A day matches if it is in any of the months, dates or date ranges
+    (if given) and it is not one of the excluded dates.
+    """
+    includes: List[Callable[[date_sys], bool]] = []
+    if months:
+        month_set = frozenset(months)
+        includes.append(lambda value: value.month in month_set)
+    includes += [_date_matcher(item) for item in dates or []]
+    includes += [_date_range_matcher(item) for item in date_ranges or []]
+    excludes = [_date_matcher(item) for item in exclude_dates or []]
+    if not includes and not excludes:
+        return None
+
+    def date_matches(value: date_sys) -> bool:
+        """Return if the given date matches the date rules."""
+        if includes and not any(func(value) for func in includes):
+            return False
+        return not any(func(value) for func in excludes)
+
+    return date_matches
+
+
 ALLOWED_WEEKDAYS = WEEKDAYS + ["workday", "not_workday"]
 validate_weekdays = vol.All(ensure_list, [vol.In(ALLOWED_WEEKDAYS)])
+validate_months = vol.All(ensure_list, [vol.All(vol.Coerce(int), vol.Range(1, 12))])
+validate_dates = vol.All(ensure_list, [validate_date_str])
+validate_date_ranges = vol.All(ensure_list, [validate_date_range_str])
@@ -0,0 +1,17 @@
+"""Tests for the schedules integration."""
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.schedules.const import DOMAIN
+
+SCHEDULE = {"after": "08:00:00", "before": "17:00:00", "condition": None}
+
+
+async def async_setup_partition(hass, title="Schedules", unique_id=None):
+    """Set up a config entry (partition) of the integration."""
+    entry = MockConfigEntry(
+        domain=DOMAIN, title=title, unique_id=unique_id, data={"workday_sensor": ""}
+    )
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    return entry
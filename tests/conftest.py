@@ -0,0 +1,3 @@
+"""Fixtures for the schedules integration tests."""
+
+pytest_plugins = "pytest_homeassistant_custom_component"
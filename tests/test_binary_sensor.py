@@ -0,0 +1,48 @@
+"""Tests for the schedule binary sensors."""
+from homeassistant.helpers.entity_registry import async_get_registry
+
+from custom_components.schedules.const import DOMAIN
+
+from . import async_setup_partition
+
+ENTITY_ID = "binary_sensor.schedule_all_day"
+
+
+async def test_expose(hass, hass_storage):
+    """Test the binary sensor of a schedule follows its expose flag."""
+    await async_setup_partition(hass)
+    registry = await async_get_registry(hass)
+
+    await hass.services.async_call(
+        DOMAIN,
+        "add",
+        {
+            "schedule_id": "all day",
+            "after": "00:00:00",
+            "before": "00:00:00",
+            "expose": False,
+        },
+        blocking=True,
+    )
+    await hass.async_block_till_done()
+    assert hass.states.get(ENTITY_ID) is None
+    assert registry.async_get(ENTITY_ID) is None
+    # headless schedules are still listed by the active schedule sensor
+    active = hass.states.get("sensor.active_schedule_sensor")
+    assert active.attributes["all_active"] == ["all day"]
+
+    await hass.services.async_call(
+        DOMAIN, "update", {"schedule_id": "all day", "expose": True}, blocking=True
+    )
+    await hass.async_block_till_done()
+    assert hass.states.get(ENTITY_ID).state == "on"
+    assert registry.async_get(ENTITY_ID).unique_id == "all day"
+
+    await hass.services.async_call(
+        DOMAIN, "update", {"schedule_id": "all day", "expose": False}, blocking=True
+    )
+    await hass.async_block_till_done()
+    assert hass.states.get(ENTITY_ID) is None
+    assert registry.async_get(ENTITY_ID) is None
+    active = hass.states.get("sensor.active_schedule_sensor")
+    assert active.attributes["all_active"] == ["all day"]
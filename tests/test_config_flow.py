@@ -0,0 +1,44 @@
+"""Tests for the schedules config flow."""
+from homeassistant import config_entries, data_entry_flow
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.schedules.const import DOMAIN
+
+
+async def _async_configure(hass, name):
+    """Run the user step of the config flow with the given partition name."""
+    result = await hass.config_entries.flow.async_init(
+        DOMAIN, context={"source": config_entries.SOURCE_USER}
+    )
+    return await hass.config_entries.flow.async_configure(
+        result["flow_id"], {"name": name, "workday_sensor": " "}
+    )
+
+
+async def test_create_partition(hass):
+    """Test a partition gets its slugified name as unique_id."""
+    result = await _async_configure(hass, "Holiday Home")
+
+    assert result["type"] == data_entry_flow.RESULT_TYPE_CREATE_ENTRY
+    assert result["title"] == "Holiday Home"
+    assert result["result"].unique_id == "holiday_home"
+
+
+async def test_abort_same_name(hass):
+    """Test a partition name can only be configured once."""
+    MockConfigEntry(domain=DOMAIN, title="Home", unique_id="home").add_to_hass(hass)
+
+    result = await _async_configure(hass, "home")
+
+    assert result["type"] == data_entry_flow.RESULT_TYPE_ABORT
+    assert result["reason"] == "already_configured"
+
+
+async def test_abort_same_name_as_legacy_entry(hass):
+    """Test the name of an entry without unique_id can not be reused."""
+    MockConfigEntry(domain=DOMAIN, title="Schedules").add_to_hass(hass)
+
+    result = await _async_configure(hass, "Schedules")
+
+    assert result["type"] == data_entry_flow.RESULT_TYPE_ABORT
+    assert result["reason"] == "already_configured"
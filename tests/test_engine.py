@@ -0,0 +1,82 @@
+"""Tests for the schedules evaluation engine."""
+from datetime import date
+
+from homeassistant.core import callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+
+from custom_components.schedules.engine import DayIndex, ScheduleEngine
+from custom_components.schedules.store import ScheduleStorage
+from custom_components.schedules.util import compile_date_rules
+
+
+async def _async_start_engine(hass, schedule_ids):
+    """Return a started engine with the given (all day, on workdays) schedules."""
+    store = ScheduleStorage(hass, "schedules.storage.test")
+    await store.async_load()
+    for schedule_id in schedule_ids:
+        store.async_create(schedule_id, "00:00:00", "00:00:00", ["workday"], None)
+    engine = ScheduleEngine(hass, "entry_id", store)
+    await engine.async_start()
+    return engine
+
+
+async def test_apply_changes_notifies_once(hass, hass_storage):
+    """Test an update of multiple schedules signals the update once."""
+    engine = await _async_start_engine(hass, ["one", "two", "three"])
+    updates = []
+
+    @callback
+    def schedule_updated(schedule_id):
+        """Record the update signal."""
+        updates.append(schedule_id)
+
+    async_dispatcher_connect(hass, "schedule_updated_entry_id", schedule_updated)
+
+    changes = engine.store.async_update_many(
+        {schedule_id: {"after": "00:00:01"} for schedule_id in engine.records}
+    )
+    await engine.async_apply_changes(changes)
+    await hass.async_block_till_done()
+
+    assert updates == [None]
+    engine.async_stop()
+
+
+async def test_workday_sensor_change_notifies_once(hass, hass_storage):
+    """Test swapping the workday sensor re-evaluates the schedules in one batch."""
+    engine = await _async_start_engine(hass, ["one", "two"])
+    updates = []
+
+    @callback
+    def schedule_updated(schedule_id):
+        """Record the update signal."""
+        updates.append(schedule_id)
+
+    async_dispatcher_connect(hass, "schedule_updated_entry_id", schedule_updated)
+    hass.states.async_set("binary_sensor.workday", "on")
+
+    await engine.async_set_workday_sensor("binary_sensor.workday")
+    await hass.async_block_till_done()
+
+    assert updates == [None]
+    assert all(record.state for record in engine.records.values())
+    engine.async_stop()
+
+
+def test_day_index_roll():
+    """Test the day index only keeps today and tomorrow and rolls at midnight."""
+    index = DayIndex()
+    index.async_roll(date(2021, 12, 31))
+    index.async_set_rules("new year", compile_date_rules(dates=["01-01"]))
+
+    assert index.has_rules("new year")
+    assert not index.matches("new year", date(2021, 12, 31))
+    assert index.matches("new year", date(2022, 1, 1))
+    assert index.matches("other", date(2021, 12, 31))
+
+    index.async_roll(date(2022, 1, 1))
+    assert index.matches("new year", date(2022, 1, 1))
+    assert not index.matches("new year", date(2022, 1, 2))
+
+    index.async_remove("new year")
+    assert not index.has_rules("new year")
@@ -0,0 +1,45 @@
+"""Tests for the schedules transition history."""
+from datetime import timedelta
+
+import homeassistant.util.dt as dt_util
+
+from custom_components.schedules.history import HISTORY_SIZE, TransitionHistory
+
+
+async def test_downtime_is_not_active(hass):
+    """Test the time Home Assistant was stopped is not counted as active."""
+    history = TransitionHistory(hass)
+    start = dt_util.utcnow() - timedelta(hours=4)
+    history.async_record("schedule", start.timestamp(), True)
+    # stopped after an hour, started again two hours later
+    history.async_stop((start + timedelta(hours=1)).timestamp())
+    history.async_record("schedule", (start + timedelta(hours=3)).timestamp(), True)
+
+    result = history.async_get("schedule", start, start + timedelta(hours=4))
+
+    assert result["active_seconds"] == 2 * 3600
+    assert [state for _, state in result["transitions"]] == ["on", "off", "on"]
+
+
+async def test_truncated_history(hass):
+    """Test a period before the oldest kept transition is not complete."""
+    history = TransitionHistory(hass)
+    start = dt_util.utcnow() - timedelta(days=2)
+    for idx in range(HISTORY_SIZE + 2):
+        history.async_record(
+            "schedule", (start + timedelta(minutes=idx)).timestamp(), not idx % 2
+        )
+    # the first two transitions (on at start, off a minute later) are dropped
+    first = start + timedelta(minutes=2)
+
+    result = history.async_get("schedule", start, start + timedelta(days=1))
+    assert not result["complete"]
+    assert result["since"] == first.isoformat()
+    assert len(result["transitions"]) == HISTORY_SIZE
+
+    result = history.async_get("schedule", first, start + timedelta(days=1))
+    assert result["complete"]
+
+    result = history.async_get("unknown", start, start + timedelta(days=1))
+    assert not result["complete"]
+    assert result["since"] is None
@@ -0,0 +1,78 @@
+"""Tests for the schedules integration setup and services."""
+import pytest
+from homeassistant.exceptions import HomeAssistantError
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.schedules.const import DATA_DOMAIN, DATA_STORE, DOMAIN
+from custom_components.schedules.store import get_history_storage_key, get_storage_key
+
+from . import SCHEDULE, async_setup_partition
+
+
+def schedule_ids(hass, entry):
+    """Return the ids of the schedules in the partition of a config entry."""
+    return list(hass.data[DATA_DOMAIN][entry.entry_id][DATA_STORE].schedules)
+
+
+def test_storage_key():
+    """Test every partition has its own storage, legacy entries keep theirs."""
+    legacy = MockConfigEntry(domain=DOMAIN, title="Schedules")
+    home = MockConfigEntry(domain=DOMAIN, title="Home", unique_id="home")
+
+    assert get_storage_key(legacy) == "schedules.storage"
+    assert get_storage_key(home) == "schedules.storage.home"
+    assert get_history_storage_key(home) == "schedules.storage.home.history"
+
+
+async def test_route_by_partition(hass, hass_storage):
+    """Test services are routed to the partition by title, unique_id or schedule."""
+    legacy = await async_setup_partition(hass, "Schedules", None)
+    home = await async_setup_partition(hass, "Holiday Home", "holiday_home")
+
+    await hass.services.async_call(
+        DOMAIN,
+        "add",
+        {"partition": "Schedules", "schedule_id": "morning", **SCHEDULE},
+        blocking=True,
+    )
+    await hass.services.async_call(
+        DOMAIN,
+        "add",
+        {"partition": "holiday_home", "schedule_id": "evening", **SCHEDULE},
+        blocking=True,
+    )
+    assert schedule_ids(hass, legacy) == ["morning"]
+    assert schedule_ids(hass, home) == ["evening"]
+
+    # without partition the partition containing the schedule is used
+    await hass.services.async_call(
+        DOMAIN, "update", {"schedule_id": "evening", "after": "18:00:00"}, blocking=True
+    )
+    assert (
+        hass.data[DATA_DOMAIN][home.entry_id][DATA_STORE].async_get("evening").after
+        == "18:00:00"
+    )
+
+    with pytest.raises(HomeAssistantError):
+        await hass.services.async_call(
+            DOMAIN, "add", {"schedule_id": "night", **SCHEDULE}, blocking=True
+        )
+    with pytest.raises(HomeAssistantError):
+        await hass.services.async_call(
+            DOMAIN,
+            "add",
+            {"partition": "unknown", "schedule_id": "night", **SCHEDULE},
+            blocking=True,
+        )
+
+    # every partition is saved to its own storage
+    for entry in (legacy, home):
+        assert await hass.config_entries.async_unload(entry.entry_id)
+    assert [
+        item["schedule_id"]
+        for item in hass_storage["schedules.storage"]["data"]["schedules"]
+    ] == ["morning"]
+    assert [
+        item["schedule_id"]
+        for item in hass_storage["schedules.storage.holiday_home"]["data"]["schedules"]
+    ] == ["evening"]
@@ -0,0 +1,43 @@
+"""Tests for the active schedule sensor."""
+from datetime import datetime
+from unittest.mock import patch
+
+import homeassistant.util.dt as dt_util
+
+from custom_components.schedules.const import DOMAIN
+
+from . import async_setup_partition
+
+SCHEDULES = {
+    # crosses midnight, started yesterday
+    "night": ("22:00:00", "13:00:00"),
+    "day": ("08:00:00", "13:00:00"),
+    "early": ("11:00:00", "12:30:00"),
+    "late": ("10:00:00", "18:00:00"),
+    # after equal to before is active all day, ends tomorrow
+    "always": ("09:00:00", "09:00:00"),
+    "inactive": ("14:00:00", "15:00:00"),
+}
+
+
+async def test_all_active_order(hass, hass_storage):
+    """Test active schedules are sorted by before time, then by after time."""
+    now = dt_util.DEFAULT_TIME_ZONE.localize(datetime(2021, 1, 4, 12))
+    with patch("homeassistant.util.dt.now", return_value=now), patch(
+        "homeassistant.util.dt.utcnow", return_value=dt_util.as_utc(now)
+    ):
+        await async_setup_partition(hass)
+        for schedule_id, (after, before) in SCHEDULES.items():
+            await hass.services.async_call(
+                DOMAIN,
+                "add",
+                {"schedule_id": schedule_id, "after": after, "before": before},
+                blocking=True,
+            )
+        await hass.async_block_till_done()
+
+    state = hass.states.get("sensor.active_schedule_sensor")
+    # same order as sorting on the before time (today or tomorrow) and after
+    # time (today or yesterday) of the original implementation
+    assert state.attributes["all_active"] == ["early", "night", "day", "late", "always"]
+    assert state.state == "early"
@@ -0,0 +1,136 @@
+"""Tests for the offline simulation of schedules."""
+import datetime
+
+import homeassistant.util.dt as dt_util
+import pytest
+
+from custom_components.schedules.engine import SECONDS_PER_DAY
+from custom_components.schedules.simulate import ScheduleSimulator, timeline_as_dict
+from custom_components.schedules.store import ScheduleEntry
+
+ALL_DAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+# a friday
+START = datetime.date(2021, 1, 1)
+
+
+def sun_event(event, day):
+    """Return sunrise at 07:00 and sunset at 17:00 (utc), no sun on 2021-01-02."""
+    if day == datetime.date(2021, 1, 2):
+        return None
+    hour = 7 if event == "sunrise" else 17
+    return datetime.datetime.combine(
+        day, datetime.time(hour), tzinfo=datetime.timezone.utc
+    )
+
+
+def at(day, hour, minute=0):
+    """Return local seconds of a day and time of the simulation."""
+    return day.toordinal() * SECONDS_PER_DAY + hour * 3600 + minute * 60
+
+
+@pytest.fixture
+def time_zone():
+    """Set the default time zone during the test."""
+    dt_util.set_default_time_zone(dt_util.get_time_zone("Europe/Amsterdam"))
+    yield
+    dt_util.set_default_time_zone(dt_util.UTC)
+
+
+def simulate(end_offset=0, holidays=None, **kwargs):
+    """Return the simulated transitions of a single schedule."""
+    kwargs.setdefault("weekdays", ALL_DAYS)
+    entry = ScheduleEntry(schedule_id="test", **kwargs)
+    end = START + datetime.timedelta(days=end_offset)
+    return ScheduleSimulator(sun_event, holidays=holidays).simulate(
+        [entry], START, end
+    )["test"]
+
+
+def test_simulate_day(time_zone):
+    """Test a schedule within a day."""
+    assert simulate(1, after="08:00:00", before="17:30:00") == [
+        (at(START, 8), True),
+        (at(START, 17, 30), False),
+        (at(START + datetime.timedelta(days=1), 8), True),
+        (at(START + datetime.timedelta(days=1), 17, 30), False),
+    ]
+
+
+def test_simulate_overnight_merges_across_midnight(time_zone):
+    """Test an overnight schedule is one interval from evening to morning."""
+    next_day = START + datetime.timedelta(days=1)
+    assert simulate(1, after="22:00:00", before="06:00:00") == [
+        (at(START, 0), True),
+        (at(START, 6), False),
+        (at(START, 22), True),
+        (at(next_day, 6), False),
+        (at(next_day, 22), True),
+        (at(next_day + datetime.timedelta(days=1), 0), False),
+    ]
+
+
+def test_simulate_weekdays_and_holidays(time_zone):
+    """Test weekdays and workdays, holidays are not a workday."""
+    # friday 2021-01-01 is a holiday, monday 2021-01-04 a workday
+    transitions = simulate(
+        3, holidays=["01-01"], after="08:00:00", before="09:00:00", weekdays=["workday"]
+    )
+    assert transitions == [
+        (at(START + datetime.timedelta(days=3), 8), True),
+        (at(START + datetime.timedelta(days=3), 9), False),
+    ]
+    transitions = simulate(
+        3, after="08:00:00", before="09:00:00", weekdays=["not_workday"]
+    )
+    assert [seconds // SECONDS_PER_DAY for seconds, _ in transitions] == [
+        datetime.date(2021, 1, 2).toordinal()
+    ] * 2 + [datetime.date(2021, 1, 3).toordinal()] * 2
+
+
+def test_simulate_date_rules(time_zone):
+    """Test the date rules of a schedule are applied."""
+    transitions = simulate(
+        30, after="08:00:00", before="09:00:00", dates=["01-15"], exclude_dates=[]
+    )
+    assert transitions == [
+        (at(datetime.date(2021, 1, 15), 8), True),
+        (at(datetime.date(2021, 1, 15), 9), False),
+    ]
+
+
+def test_simulate_sun_events(time_zone):
+    """Test sun events with offset, days without the sun event are skipped."""
+    assert simulate(2, after="sunrise + 00:30:00", before="sunset - 01:00:00") == [
+        # 07:00 utc is 08:00 local
+        (at(START, 8, 30), True),
+        (at(START, 17), False),
+        (at(START + datetime.timedelta(days=2), 8, 30), True),
+        (at(START + datetime.timedelta(days=2), 17), False),
+    ]
+
+
+def test_simulate_incomplete_schedule(time_zone):
+    """Test a schedule without before time has no transitions."""
+    assert simulate(1, after="08:00:00", before=None) == []
+
+
+def test_timeline_as_dict_dst(time_zone):
+    """Test transitions get the utc offset of their day, also on DST change days."""
+    transitions = []
+    for day in (27, 28, 29):
+        transitions += [
+            (at(datetime.date(2021, 3, day), 1), True),
+            (at(datetime.date(2021, 3, day), 4), False),
+        ]
+
+    result = timeline_as_dict({"test": transitions})["test"]
+
+    assert result["active_seconds"] == 3 * 3 * 3600
+    assert result["transitions"] == [
+        ["2021-03-27T01:00:00+01:00", "on"],
+        ["2021-03-27T04:00:00+01:00", "off"],
+        ["2021-03-28T01:00:00+01:00", "on"],
+        ["2021-03-28T04:00:00+02:00", "off"],
+        ["2021-03-29T01:00:00+02:00", "on"],
+        ["2021-03-29T04:00:00+02:00", "off"],
+    ]
@@ -0,0 +1,36 @@
+"""Tests for the schedules storage."""
+import pytest
+
+from custom_components.schedules.store import ScheduleStorage
+
+
+async def test_update_many(hass, hass_storage):
+    """Test updating multiple schedules returns the changed fields."""
+    store = ScheduleStorage(hass, "schedules.storage.test")
+    await store.async_load()
+    store.async_create("morning", "07:00:00", "09:00:00", ["mon"], None)
+    store.async_create("evening", "19:00:00", "22:00:00", ["mon"], None)
+
+    changes = store.async_update_many(
+        {
+            "morning": {"schedule_id": "morning", "after": "06:30:00"},
+            "evening": {"schedule_id": "evening", "weekdays": ["mon"]},
+        }
+    )
+
+    assert changes == {"morning": {"after"}, "evening": set()}
+    assert store.async_get("morning").after == "06:30:00"
+
+
+async def test_update_many_unknown_schedule(hass, hass_storage):
+    """Test no schedule is updated if one of them does not exist."""
+    store = ScheduleStorage(hass, "schedules.storage.test")
+    await store.async_load()
+    store.async_create("morning", "07:00:00", "09:00:00", ["mon"], None)
+
+    with pytest.raises(KeyError):
+        store.async_update_many(
+            {"morning": {"after": "06:30:00"}, "unknown": {"after": "06:30:00"}}
+        )
+
+    assert store.async_get("morning").after == "07:00:00"
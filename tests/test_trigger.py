@@ -0,0 +1,67 @@
+"""Tests for the schedules automation trigger."""
+import pytest
+import voluptuous as vol
+from homeassistant.core import callback
+
+from custom_components.schedules import const, trigger
+
+
+def _transitions(*transitions):
+    """Return transition event data of the given (schedule_id, state) tuples."""
+    return {
+        const.ATTR_PARTITION: "entry_id",
+        const.ATTR_TRANSITIONS: [
+            {
+                const.ATTR_SCHEDULE_ID: schedule_id,
+                const.ATTR_STATE: state,
+                const.ATTR_TIME: "2021-01-01T08:00:00+00:00",
+            }
+            for schedule_id, state in transitions
+        ],
+    }
+
+
+async def test_validate_trigger_config(hass):
+    """Test validation of the trigger config."""
+    config = await trigger.async_validate_trigger_config(
+        hass, {"platform": "schedules", "schedule_id": "working hours", "to": "on"}
+    )
+    assert config[const.ATTR_SCHEDULE_ID] == ["working hours"]
+    assert config[const.CONF_TO] == "on"
+
+    with pytest.raises(vol.Invalid):
+        await trigger.async_validate_trigger_config(
+            hass, {"platform": "schedules", "to": "unknown"}
+        )
+
+
+async def test_attach_trigger(hass):
+    """Test the trigger fires for matching transitions only."""
+    calls = []
+
+    @callback
+    def action(variables, context=None):
+        """Record the trigger variables."""
+        calls.append(variables["trigger"])
+
+    config = await trigger.async_validate_trigger_config(
+        hass, {"platform": "schedules", "schedule_id": "working hours", "to": "on"}
+    )
+    remove = await trigger.async_attach_trigger(hass, config, action, {})
+
+    hass.bus.async_fire(
+        const.EVENT_TRANSITION,
+        _transitions(("working hours", "on"), ("evening", "on")),
+    )
+    hass.bus.async_fire(const.EVENT_TRANSITION, _transitions(("working hours", "off")))
+    await hass.async_block_till_done()
+
+    assert len(calls) == 1
+    assert calls[0]["platform"] == const.DOMAIN
+    assert calls[0][const.ATTR_SCHEDULE_ID] == "working hours"
+    assert calls[0][const.ATTR_STATE] == "on"
+
+    remove()
+    hass.bus.async_fire(const.EVENT_TRANSITION, _transitions(("working hours", "on")))
+    await hass.async_block_till_done()
+    assert len(calls) == 1
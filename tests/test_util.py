@@ -0,0 +1,127 @@
+"""Tests for the schedules utilities."""
+from datetime import date, timedelta
+
+import pytest
+import voluptuous as vol
+
+from custom_components.schedules.util import (
+    compile_date_rules,
+    compile_time_str,
+    parse_date_range_str,
+    parse_date_str,
+    validate_date_ranges,
+    validate_dates,
+    validate_months,
+)
+
+
+def test_parse_date_str():
+    """Test parsing specific and recurring dates."""
+    assert parse_date_str("2021-03-01") == (2021, 3, 1)
+    assert parse_date_str(" 12-25 ") == (None, 12, 25)
+    # recurring leap day is allowed, a specific one only in leap years
+    assert parse_date_str("02-29") == (None, 2, 29)
+    assert parse_date_str("2020-02-29") == (2020, 2, 29)
+    for invalid in ("2021-02-29", "02-30", "13-01", "2021", "abc"):
+        with pytest.raises(ValueError):
+            parse_date_str(invalid)
+
+
+def test_parse_date_range_str():
+    """Test parsing date ranges, mixing recurring and specific dates fails."""
+    assert parse_date_range_str("12-01/02-28") == ((None, 12, 1), (None, 2, 28))
+    with pytest.raises(ValueError):
+        parse_date_range_str("2021-01-01/02-01")
+    with pytest.raises(ValueError):
+        parse_date_range_str("2021-01-01")
+
+
+def test_validators():
+    """Test validation of the date rules of a schedule."""
+    assert validate_months("1, 12") == [1, 12]
+    assert validate_dates("12-25, 2021-01-01") == ["12-25", "2021-01-01"]
+    assert validate_date_ranges(["2021-01-01 / 2021-02-01"]) == [
+        "2021-01-01/2021-02-01"
+    ]
+    with pytest.raises(vol.Invalid):
+        validate_months([13])
+    with pytest.raises(vol.Invalid):
+        validate_dates(["02-30"])
+    with pytest.raises(vol.Invalid):
+        validate_date_ranges(["2021-01-01/02-01"])
+
+
+def test_no_date_rules():
+    """Test a schedule without date rules has no matcher."""
+    assert compile_date_rules() is None
+    assert compile_date_rules([], [], [], []) is None
+
+
+def test_months_and_dates():
+    """Test months and (recurring) dates are combined."""
+    matches = compile_date_rules(months=[6], dates=["12-25", "2021-01-01"])
+    assert matches(date(2021, 6, 15))
+    assert matches(date(2021, 12, 25))
+    assert matches(date(2030, 12, 25))
+    assert matches(date(2021, 1, 1))
+    assert not matches(date(2022, 1, 1))
+    assert not matches(date(2021, 7, 1))
+
+
+def test_recurring_leap_day():
+    """Test a recurring 02-29 only matches in leap years."""
+    matches = compile_date_rules(dates=["02-29"])
+    assert matches(date(2024, 2, 29))
+    assert not matches(date(2023, 2, 28))
+    assert not matches(date(2023, 3, 1))
+
+
+def test_date_range_wraps_year_end():
+    """Test a recurring date range over the year end, both ends inclusive."""
+    matches = compile_date_rules(date_ranges=["12-01/02-28"])
+    assert not matches(date(2021, 11, 30))
+    assert matches(date(2021, 12, 1))
+    assert matches(date(2021, 12, 31))
+    assert matches(date(2022, 1, 1))
+    assert matches(date(2022, 2, 28))
+    assert not matches(date(2024, 2, 29))
+    assert not matches(date(2022, 3, 1))
+
+
+def test_date_ranges():
+    """Test recurring and specific date ranges within a year."""
+    matches = compile_date_rules(date_ranges=["06-01/08-31", "2021-12-24/2021-12-26"])
+    assert matches(date(2030, 6, 1))
+    assert matches(date(2030, 8, 31))
+    assert not matches(date(2030, 9, 1))
+    assert matches(date(2021, 12, 26))
+    assert not matches(date(2022, 12, 26))
+
+
+def test_exclude_dates_only():
+    """Test excluded dates without includes match every other day."""
+    matches = compile_date_rules(exclude_dates=["12-25", "2021-01-01"])
+    assert matches(date(2021, 12, 24))
+    assert not matches(date(2021, 12, 25))
+    assert not matches(date(2021, 1, 1))
+    assert matches(date(2022, 1, 1))
+
+
+def test_exclude_dates_within_range():
+    """Test excluded dates win over the included dates."""
+    matches = compile_date_rules(months=[12], exclude_dates=["12-25"])
+    assert matches(date(2021, 12, 24))
+    assert not matches(date(2021, 12, 25))
+    assert not matches(date(2021, 11, 25))
+
+
+def test_compile_time_str():
+    """Test compiling regular and sun event time strings."""
+    assert compile_time_str("07:30:00") == (None, timedelta(hours=7, minutes=30))
+    assert compile_time_str(" 23:59 ") == (None, timedelta(hours=23, minutes=59))
+    assert compile_time_str("sunrise") == ("sunrise", timedelta())
+    assert compile_time_str("sunset - 00:30:00") == (
+        "sunset",
+        timedelta(minutes=-30),
+    )
+    assert compile_time_str("sunrise + 01:00") == ("sunrise", timedelta(hours=1))